@@ -1,4 +1,5 @@
 from _pytest.config import filename_arg
+import gc
 import pytest
 import os
 
@@ -46,6 +47,32 @@ def test_pcell_inheritance():
     assert pad_array.params["pad_size"] is pad_array.params.pad_size
 
 
+def test_pcell_params_changed_after_definition():
+    class Base(PCell):
+        params = ParamContainer(PCellParameter(name="base_size", default=1))
+
+    class Derived(Base):
+        params = ParamContainer(PCellParameter(name="derived_size", default=2))
+
+    assert dict(Derived("d").params) == {"base_size": 1, "derived_size": 2}
+
+    # changes to the class params reach new instances, also from a parent
+    Base.params.base_size = 5
+    Base.params.add_param(PCellParameter(name="late", default=3))
+    Derived.params.derived_size = 6
+    assert dict(Derived("d").params) == {"base_size": 5, "derived_size": 6, "late": 3}
+    assert dict(Base("b").params) == {"base_size": 5, "late": 3}
+
+    # and so does replacing them altogether
+    Base.params = ParamContainer(PCellParameter(name="other", default=4))
+    assert dict(Derived("d").params) == {"other": 4, "derived_size": 6}
+
+    # instance changes stay with the instance
+    derived = Derived("d", params={"derived_size": 7})
+    assert derived.params.derived_size == 7
+    assert Derived("d").params.derived_size == 6
+
+
 # Testing the most basic cells: GDSCell
 
 gdslibpath = os.path.abspath(
@@ -151,3 +178,32 @@ def test_gdscellcache(top_cell):
         if cell.name.startswith("princeton_logo"):
             cell_count += 1
     assert cell_count == 1
+
+
+def test_gdscellcache_layout_lifetime():
+    princeton_logo = GDSCell("princeton_logo", "princeton_logo_simple.gds", gdslibpath)(
+        name="xyz"
+    )
+    cell_cache = princeton_logo._cell_cache
+    cell_cache.clear()
+
+    layout = kdb.Layout()
+    gdscell = princeton_logo.get_gds_cell(layout)
+    assert princeton_logo.get_gds_cell(layout) is gdscell
+    assert len(cell_cache) == 1
+
+    # the cache does not keep the layout alive, and forgets it once it is gone
+    del layout, gdscell
+    gc.collect()
+    assert len(cell_cache) == 0
+
+    # new layouts often reuse the id of a destroyed one (in CPython, usually
+    # the very same id), they must never get a cell from the old layout.
+    for _ in range(20):
+        layout = kdb.Layout()
+        gdscell = princeton_logo.get_gds_cell(layout)
+        assert gdscell.layout() is layout
+        assert len(cell_cache) == 1
+        del layout, gdscell
+        gc.collect()
+    assert len(cell_cache) == 0
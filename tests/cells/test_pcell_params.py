@@ -1,6 +1,9 @@
+import copy
+import pickle
+
 import pytest
 from ..context import zeropdk
-from zeropdk.pcell import ParamContainer, PCellParameter
+from zeropdk.pcell import ParamContainer, PCellParameter, objectdict, objectview
 
 from klayout.db import DPoint
 
@@ -44,3 +47,86 @@ def test_quirky_cases():
         TypeError, match="'ParamContainer' object does not support item assignment"
     ):
         pc["orange"] = 2
+
+
+def test_objectview_add():
+    view = objectview({"orange": 1})
+    for new_view in (view + {"apple": 2}, view + [("apple", 2)], [("apple", 2)] + view):
+        assert isinstance(new_view, objectview)
+        assert dict(new_view) == {"orange": 1, "apple": 2}
+    assert dict(view) == {"orange": 1}
+
+
+def test_objectdict():
+    d = objectdict({"orange": 1, "items": 2})
+    assert d.orange == 1
+    d.apple = 3
+    assert d["apple"] == 3
+
+    # dict methods win over keys with the same name
+    assert sorted(d.items()) == [("apple", 3), ("items", 2), ("orange", 1)]
+    assert d["items"] == 2
+
+    with pytest.raises(AttributeError, match="banana"):
+        d.banana
+
+    d2 = d + {"banana": 4}
+    assert isinstance(d2, objectdict)
+    assert d2.banana == 4 and d2.orange == 1
+    assert "banana" not in d
+    assert d + [("banana", 4)] == d2
+    assert isinstance([("banana", 4)] + d, objectdict)
+
+    for d3 in (copy.copy(d), copy.deepcopy(d), pickle.loads(pickle.dumps(d))):
+        assert isinstance(d3, objectdict)
+        assert d3 == d
+        d3.orange = 5
+        assert d3.orange == 5 and d.orange == 1
+
+
+def test_copy():
+    pc = ParamContainer()
+    pc.add_param(PCellParameter(name="orange", default=1))
+    pc.add_param(PCellParameter(name="strawberry", default=DPoint(0, 0)))
+    pc.strawberry = DPoint(1, 2)
+
+    for pc_copy in (copy.copy(pc), copy.deepcopy(pc)):
+        assert type(pc_copy) is ParamContainer
+        assert dict(pc_copy) == dict(pc)
+
+        # changes in the copy do not affect the original, and vice versa
+        pc_copy.orange = 2
+        pc_copy.add_param(PCellParameter(name="apple", default=3))
+        assert pc.orange == 1
+        assert "apple" not in pc
+
+    # only deepcopy duplicates mutable values
+    assert copy.copy(pc).strawberry is pc.strawberry
+    pc_deepcopy = copy.deepcopy(pc)
+    assert pc_deepcopy.strawberry is not pc.strawberry
+    assert pc_deepcopy.strawberry == DPoint(1, 2)
+
+
+def test_copy_subclass():
+    class FruitContainer(ParamContainer):
+        def __init__(self, fruit):
+            super().__init__(PCellParameter(name=fruit, default=1))
+
+    pc = FruitContainer("orange")
+    pc_copy = copy.copy(pc)
+    assert type(pc_copy) is FruitContainer
+    assert pc_copy.orange == 1
+    assert type(copy.deepcopy(pc)) is FruitContainer
+
+
+def test_underscored_names():
+    pc = ParamContainer()
+    pc.add_param(PCellParameter(name="_orange", default=1))
+    pc._orange = 2
+    assert pc._orange == 2
+    assert pc["_orange"] == 2
+
+    with pytest.raises(KeyError):
+        pc._apple = 1
+    with pytest.raises(KeyError):
+        setattr(pc, "", 1)
@@ -0,0 +1,90 @@
+from ..context import zeropdk  # noqa
+from zeropdk.pcell import Port, place_cell, port_to_pin_helper
+
+import klayout.db as kdb
+
+
+def _shape_strings(cell, layer):
+    return sorted(str(shape) for shape in cell.shapes(layer).each())
+
+
+def test_port_to_pin_helper():
+    layout = kdb.Layout()
+    layout.dbu = 0.001
+    layer = layout.layer(1, 0)
+    ports = [
+        Port("opt1", kdb.DPoint(0, 0), kdb.DVector(1, 0), 0.5),
+        Port("el1", kdb.DPoint(10, 5), kdb.DVector(0.6, -0.8), 3),
+    ]
+
+    helper_cell = layout.create_cell("HELPER")
+    port_to_pin_helper(ports, helper_cell, layer)
+
+    # same shapes as drawing the ports one by one
+    draw_cell = layout.create_cell("DRAW")
+    for port in ports:
+        port.draw(draw_cell, layer)
+
+    assert _shape_strings(helper_cell, layer) == _shape_strings(draw_cell, layer)
+
+    # any iterable of ports works
+    generator_cell = layout.create_cell("GENERATOR")
+    port_to_pin_helper((port for port in ports), generator_cell, layer)
+    assert _shape_strings(generator_cell, layer) == _shape_strings(draw_cell, layer)
+
+    empty_cell = layout.create_cell("EMPTY")
+    port_to_pin_helper(iter([]), empty_cell, layer)
+    assert empty_cell.is_empty()
+
+
+def test_port_to_pin_helper_subclass():
+    class BoxPort(Port):
+        def draw(self, cell, layer):
+            cell.shapes(layer).insert(kdb.DBox(self.position, self.position + self.direction))
+            return self
+
+    layout = kdb.Layout()
+    layout.dbu = 0.001
+    layer = layout.layer(1, 0)
+    TOP = layout.create_cell("TOP")
+    port_to_pin_helper([BoxPort("opt1", kdb.DPoint(0, 0), kdb.DVector(1, 1), 0.5)], TOP, layer)
+
+    assert _shape_strings(TOP, layer) == ["box (0,0;1000,1000)"]
+
+
+def test_place_cell_transform_into():
+    layout = kdb.Layout()
+    layout.dbu = 0.001
+    layer = layout.layer(1, 0)
+
+    child = layout.create_cell("CHILD")
+    child.shapes(layer).insert(kdb.DBox(0, 0, 2, 1))
+
+    # rotated and mirrored instances of the same child
+    parent = layout.create_cell("PARENT")
+    R90 = kdb.DTrans(kdb.DTrans.R90, kdb.DVector(10, 0))
+    M0 = kdb.DTrans(kdb.DTrans.M0, kdb.DVector(0, 10))
+    parent.insert(kdb.DCellInstArray(child.cell_index(), R90))
+    parent.insert(kdb.DCellInstArray(child.cell_index(), M0))
+
+    ports = {
+        "opt1": Port("opt1", kdb.DPoint(5, 5), kdb.DVector(1, 0), 0.5),
+        "opt2": Port("opt2", kdb.DPoint(10, 5), kdb.DVector(1, 0), 0.5),
+    }
+
+    TOP = layout.create_cell("TOP")
+    new_ports = place_cell(
+        TOP, parent, ports, kdb.DPoint(100, 100), relative_to="opt1", transform_into=True
+    )
+
+    assert new_ports["opt1"].position == kdb.DPoint(100, 100)
+    assert new_ports["opt2"].position == kdb.DPoint(105, 100)
+    # the original ports are left untouched
+    assert ports["opt1"].position == kdb.DPoint(5, 5)
+
+    # the parent's origin is now at opt1
+    boxes = sorted(
+        str(polygon.bbox().to_dtype(layout.dbu))
+        for polygon in kdb.Region(TOP.begin_shapes_rec(layer)).each()
+    )
+    assert boxes == ["(104,95;105,97)", "(95,104;97,105)"]
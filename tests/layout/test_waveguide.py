@@ -4,9 +4,14 @@ import numpy as np
 import pytest
 from zeropdk.klayout_extend.layout import layout_read_cell
 
-from zeropdk.layout.waveguide_rounding import compute_rounded_path, layout_waveguide_from_points
+from zeropdk.layout.waveguide_rounding import (
+    compute_rounded_path,
+    layout_waveguide_from_points,
+    solve_Z,
+)
 from ..context import zeropdk  # noqa
-from zeropdk.layout.waveguides import waveguide_dpolygon
+from zeropdk.exceptions import ZeroPDKUserError
+from zeropdk.layout.waveguides import layout_waveguide, layout_waveguides, waveguide_dpolygon
 from zeropdk.layout import insert_shape
 
 import klayout.db as kdb
@@ -157,7 +162,67 @@ def test_waveguide_rounding(top_cell: Callable[[], Tuple[kdb.Cell, kdb.Layout]])
 
     new_waveguides = kdb.Region(TOP.shapes(layer))
     ref_waveguides = kdb.Region(TOP_reference.shapes(layer))
-    new_waveguides -= ref_waveguides
-    assert new_waveguides.area() == 0
+    # missing and extra geometry both count
+    assert (new_waveguides ^ ref_waveguides).is_empty()
 
-    TOP.write("tests/tmp/test_waveguide_rounding.gds")
\ No newline at end of file
+    TOP.write("tests/tmp/test_waveguide_rounding.gds")
+
+
+def test_solve_Z_wide_angle():
+    # here α1 - γ is larger than 180 degrees, so sin(|α1 - γ|) is negative
+    A = kdb.DPoint(-20.2406, 21.7890)
+    B = kdb.DPoint(13.9909, 39.6045)
+    C = kdb.DPoint(53.7543, 51.5759)
+    D = kdb.DPoint(-29.071, 30.6262)
+
+    solution, (Dprime, _) = solve_Z(A, B, C, D, 3)
+    line, arc1, arc2 = solution
+
+    assert line.P2.x == pytest.approx(38.5111025128)
+    assert line.P2.y == pytest.approx(52.3658358417)
+    assert arc1.P2.x == pytest.approx(38.58167575)
+    assert arc1.P2.y == pytest.approx(47.0079416779)
+    assert Dprime.x == pytest.approx(36.53161813)
+    assert Dprime.y == pytest.approx(47.2196221674)
+
+
+def test_layout_waveguides(top_cell: Callable[[], Tuple[kdb.Cell, kdb.Layout]]):
+    t = np.linspace(-1, 1, 50)
+    ex = kdb.DPoint(1, 0)
+    ey = kdb.DPoint(0, 1)
+
+    list_of_points = [
+        list(100 * t * ex + 100 * t ** 2 * ey),
+        [0 * ex, 10 * ex],
+        [20 * ey, 30 * ex + 20 * ey, 30 * ex + 50 * ey],
+    ]
+    list_of_widths = [1, [0.5, 2], [1, 2, 3]]
+
+    TOP, layout = top_cell()
+    layer = layout.layer(1, 0)
+    dpolygons = layout_waveguides(TOP, layer, list_of_points, list_of_widths, smooth=True)
+    assert len(dpolygons) == 3
+
+    # same shapes as one layout_waveguide call per waveguide
+    TOP_ref, _ = top_cell()
+    for points_list, width in zip(list_of_points, list_of_widths):
+        layout_waveguide(TOP_ref, layer, points_list, width, smooth=True)
+
+    new_waveguides = kdb.Region(TOP.shapes(layer))
+    ref_waveguides = kdb.Region(TOP_ref.shapes(layer))
+    assert new_waveguides.count() == 3
+    assert (new_waveguides ^ ref_waveguides).is_empty()
+
+    # each waveguide goes through its own points
+    for dpolygon, points_list in zip(dpolygons, list_of_points):
+        assert dpolygon.bbox().contains(points_list[0])
+        assert dpolygon.bbox().contains(points_list[-1])
+
+
+def test_layout_waveguides_mismatch(top_cell: Callable[[], Tuple[kdb.Cell, kdb.Layout]]):
+    TOP, layout = top_cell()
+    layer = layout.layer(1, 0)
+    points_list = [kdb.DPoint(0, 0), kdb.DPoint(10, 0)]
+    with pytest.raises(ZeroPDKUserError, match="Got 2 waveguides but 1 widths"):
+        layout_waveguides(TOP, layer, [points_list, points_list], [1])
+    assert TOP.shapes(layer).is_empty()
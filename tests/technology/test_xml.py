@@ -11,3 +11,18 @@ def test_load_from_xml():
     filepath = Path(os.path.dirname(__file__)).resolve() / "EBeam.lyp"
     ebeam = Tech.load_from_xml(filepath)
     assert ebeam.layers["M1"] == kdb.LayerInfo(41, 0, "M1")
+
+
+def test_load_from_xml_edited(tmp_path):
+    source = Path(os.path.dirname(__file__)).resolve() / "EBeam.lyp"
+    filepath = tmp_path / "EBeam.lyp"
+    lyp = source.read_text()
+    filepath.write_text(lyp)
+    assert Tech.load_from_xml(filepath).layers["M1"] == kdb.LayerInfo(41, 0, "M1")
+
+    # move M1 to another layer, with a distinct modification time
+    mtime_ns = filepath.stat().st_mtime_ns
+    assert "<source>41/0@1</source>" in lyp
+    filepath.write_text(lyp.replace("<source>41/0@1</source>", "<source>42/0@1</source>"))
+    os.utime(filepath, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+    assert Tech.load_from_xml(filepath).layers["M1"] == kdb.LayerInfo(42, 0, "M1")
@@ -118,6 +118,12 @@ def manhattan_intersection(vertical_point, horizontal_point, ex):
 
     Caveat: this formula only works for orthogonal coordinate systems.
     """
+    # Fast path for axis-aligned ex, which is the most common case.
+    if ex.y == 0 and abs(ex.x) == 1:
+        return ex.__class__(vertical_point.x, horizontal_point.y)
+    if ex.x == 0 and abs(ex.y) == 1:
+        return ex.__class__(horizontal_point.x, vertical_point.y)
+
     ey = rotate90(ex)
     return vertical_point * ex * ex + horizontal_point * ey * ey
 
@@ -139,6 +145,19 @@ def find_Z_orientation(P0, P1, ex):
     return orient
 
 
+def _ports_to_soa(ports, ex):
+    """Packs the ports' projections onto ex and their widths into arrays.
+
+    Returns:
+        (projections, widths), both 1d arrays of length len(ports)
+    """
+    coords = np.array([(port.position.x, port.position.y) for port in ports], dtype=float)
+    coords = coords.reshape(-1, 2)
+    projections = coords[:, 0] * ex.x + coords[:, 1] * ex.y
+    widths = np.array([port.width for port in ports], dtype=float)
+    return projections, widths
+
+
 def cluster_ports(ports_from, ports_to, ex):
     """Given two (equal length) port arrays, divide them into clusters
     based on the connection orientation. The idea is that each cluster
@@ -161,25 +180,38 @@ def cluster_ports(ports_from, ports_to, ex):
     if len(ports_from) == 0:
         return []
 
+    # project all ports onto ex at once and sort the arrays first
+    proj_from, widths_from = _ports_to_soa(ports_from, ex)
+    proj_to, widths_to = _ports_to_soa(ports_to, ex)
+    order_from = np.argsort(proj_from, kind="stable")
+    order_to = np.argsort(proj_to, kind="stable")
+    ports_from = [ports_from[i] for i in order_from]
+    ports_to = [ports_to[i] for i in order_to]
+
     orient_old = None
     port_cluster = []
     port_clusters = []
-    # sort the arrays first
-    proj_ex = lambda p: p.position * ex
-    ports_from = sorted(ports_from, key=proj_ex)
-    ports_to = sorted(ports_to, key=proj_ex)
-    for port_from, port_to in zip(ports_from, ports_to):
+    last_from = last_to = None
+    for port_from, port_to, x_from, w_from, x_to, w_to in zip(
+        ports_from,
+        ports_to,
+        proj_from[order_from].tolist(),
+        widths_from[order_from].tolist(),
+        proj_to[order_to].tolist(),
+        widths_to[order_to].tolist(),
+    ):
         new_cluster = False
-        orient_new = find_Z_orientation(port_from.position, port_to.position, ex)
+        # same as find_Z_orientation(port_from.position, port_to.position, ex)
+        orient_new = 0 if x_to > x_from else 1
         # first pair
         if orient_old is None:
             port_cluster.append((port_from, port_to))
         # the rest of the pairs
         elif orient_new == orient_old:
             # if the ports are too spaced apart, initiate new cluster
-            right_port = min(port_from, port_to, key=proj_ex)
-            left_port = max(port_cluster[-1], key=proj_ex)
-            if proj_ex(right_port) - right_port.width > proj_ex(left_port) + left_port.width:
+            right_x, right_w = (x_from, w_from) if x_from <= x_to else (x_to, w_to)
+            left_x, left_w = last_from if last_from[0] >= last_to[0] else last_to
+            if right_x - right_w > left_x + left_w:
                 new_cluster = True
             else:
                 port_cluster.append((port_from, port_to))
@@ -191,6 +223,7 @@ def cluster_ports(ports_from, ports_to, ex):
             port_cluster = []
             port_cluster.append((port_from, port_to))
         orient_old = orient_new
+        last_from, last_to = (x_from, w_from), (x_to, w_to)
     port_clusters.append((port_cluster, orient_old))
     return port_clusters
 
@@ -2,7 +2,7 @@
 
 import logging
 import math
-import numpy as np
+from typing import Any, NamedTuple
 import pya
 from zeropdk.layout.geometry import bezier_optimal
 
@@ -23,6 +23,14 @@ TAPER_WIDTH = 3
 TAPER_LENGTH = 20
 
 
+class PathNode(NamedTuple):
+    """A vertex of a manhattan trace. Unpacks like a (point, layer, width) tuple."""
+
+    point: pya.DPoint
+    layer: Any
+    width: float
+
+
 # The function below is just a reference. You need to provide an EBEAM_TECH
 # or replace the layer in the call to layout_waveguide_from_points
 def layout_ebeam_waveguide_from_points(
@@ -58,7 +66,7 @@ def layout_ebeam_waveguide_from_points(
 def ensure_layer(layout, layer):
     if isinstance(layer, pya.LayerInfo):
         return layout.layer(layer)
-    elif isinstance(layer, type(1)):
+    elif isinstance(layer, int):
         return layer
     else:
         logger.error(f"{layer} not recognized")
@@ -95,6 +103,14 @@ def common_layout_manhattan_traces(
     _, previous_layer, _ = path[0]
     layout = cell.layout()
 
+    # paths usually alternate between a handful of layers
+    layer_indexes = dict()
+
+    def layer_index(layer):
+        if layer not in layer_indexes:
+            layer_indexes[layer] = ensure_layer(layout, layer)
+        return layer_indexes[layer]
+
     for point, layer, width in path:
         if isinstance(point, tuple):  # point are (x, y) coordinates
             x, y = point
@@ -109,7 +125,7 @@ def common_layout_manhattan_traces(
         if layer != previous_layer:  # time to place a via and layout
             layout_waveguide(
                 cell,
-                ensure_layer(layout, previous_layer),
+                layer_index(previous_layer),
                 points_list,
                 widths_list,
                 smooth=True,
@@ -126,7 +142,7 @@ def common_layout_manhattan_traces(
     if len(points_list) >= 2:
         layout_waveguide(
             cell,
-            ensure_layer(layout, previous_layer),
+            layer_index(previous_layer),
             points_list,
             widths_list,
             smooth=True,
@@ -176,7 +192,7 @@ def compute_paths_from_clusters(
         - middle_taper: Adds a middle point in the Z-shaped trace attempting to avoid collisions and DRC errors.
     provide a pitch for optical waveguides. electrical waveguides are figured
     out automatically.
-    path: list of tuples containing necessary info (pya.DPoint, layer, width)
+    path: list of PathNode tuples containing necessary info (pya.DPoint, layer, width)
     """
 
     Z = 0
@@ -232,8 +248,8 @@ def compute_paths_from_clusters(
             new_height = height + abs(offset_port_from - P0 * ey)
             paths_cluster.append(
                 append_Z_trace_vertical(
-                    [(P0, layer, port_from.width)],
-                    (P3, layer, port_to.width),
+                    [PathNode(P0, layer, port_from.width)],
+                    PathNode(P3, layer, port_to.width),
                     new_height,
                     ex,
                     middle_taper=middle_taper,
@@ -251,15 +267,15 @@ def bus_route_Z(cell, ports_from, ports_to, ex, pitch=WAVEGUIDE_RADIUS, radius=W
     paths = compute_paths_from_clusters(port_clusters, None, ex, pitch)
 
     for trace_path in paths:
-        path = [point for point, _, _ in trace_path]
+        path = [node.point for node in trace_path]
         layout_ebeam_waveguide_from_points(cell, path, radius)
 
 
 def append_Z_trace_vertical(path, new_point, height, ex, middle_layer=None, middle_taper=False):
     """Adds new_point to the path list plus TWO Z or S manhattan interesections.
     Args:
-        path: list of tuples containing necessary info (pya.DPoint, layer, width)
-        new_point: tuple ((x, y) or pya.DPoint, layer, width)
+        path: list of PathNode tuples containing necessary info (pya.DPoint, layer, width)
+        new_point: PathNode or tuple ((x, y) or pya.DPoint, layer, width)
         height: y-coordinate of where to place the inner point,
             from 0 to abs(new_point.y - path.y)
         ex: orientation of ports
@@ -304,7 +320,7 @@ def append_Z_trace_vertical(path, new_point, height, ex, middle_layer=None, midd
         wmid = w2
         lmid = l2
 
-    path.append((P1, l1, w1))
+    path.append(PathNode(P1, l1, w1))
 
     # move P2 a little bit to avoid acute corners
     delta_w = abs(w2 - w1) / 2
@@ -314,15 +330,16 @@ def append_Z_trace_vertical(path, new_point, height, ex, middle_layer=None, midd
 
     Pmid = (P1 + P2) / 2
 
-    if (P1 - P2).norm() <= max(w1, w2):
-        if (P3 - P2) * ey > max(w1, w2) * 3:
-            path.append((P2 + ey * max(w1, w2) * 3, l2, w2))
+    w_max = max(w1, w2)
+    if (P1 - P2).norm() <= w_max:
+        if (P3 - P2) * ey > w_max * 3:
+            path.append(PathNode(P2 + ey * w_max * 3, l2, w2))
         else:
-            path.append((P3 + ey * max(w1, w2) * 0.2, l3, w3))
+            path.append(PathNode(P3 + ey * w_max * 0.2, l3, w3))
     else:
         if middle_taper:
-            path.append((Pmid, lmid, wmid))
-        path.append((P2, l2, w2))
+            path.append(PathNode(Pmid, lmid, wmid))
+        path.append(PathNode(P2, l2, w2))
     path.append(new_point)
     return path
 
@@ -340,8 +357,8 @@ def layout_connect_ports(cell, layer, port_from, port_to, smooth=True):
         P0 = port_from.position - dbu * port_from.direction
         P3 = port_to.position - dbu * port_to.direction
         smooth = smooth or True
-    angle_from = np.arctan2(port_from.direction.y, port_from.direction.x) * 180 / math.pi
-    angle_to = np.arctan2(-port_to.direction.y, -port_to.direction.x) * 180 / math.pi
+    angle_from = math.degrees(math.atan2(port_from.direction.y, port_from.direction.x))
+    angle_to = math.degrees(math.atan2(-port_to.direction.y, -port_to.direction.x))
 
     curve = bezier_optimal(P0, P3, angle_from, angle_to)
     logger.debug(f"bezier_optimal({P0}, {P3}, {angle_from}, {angle_to})")
@@ -400,8 +417,8 @@ def append_L_trace(path, new_point, middle_layer, ex):
     """Adds new_point to the path list plus ONE L manhattan intersection.
 
     Args:
-        path: list of tuples containing necessary info ((x, y) or pya.DPoint, layer, width)
-        new_point: tuple ((x, y) or pya.DPoint, layer, width)
+        path: list of PathNode tuples containing necessary info ((x, y) or pya.DPoint, layer, width)
+        new_point: PathNode or tuple ((x, y) or pya.DPoint, layer, width)
     """
 
     assert len(path) > 0
@@ -410,6 +427,6 @@ def append_L_trace(path, new_point, middle_layer, ex):
     p2, l2, w2 = new_point  # pylint: disable=unused-variable
     joint_width = min(w1, w2)
     joint_point = manhattan_intersection(p1, p2, ex)
-    path.append((joint_point, middle_layer, joint_width))
+    path.append(PathNode(joint_point, middle_layer, joint_width))
     path.append(new_point)
     return path
@@ -1,17 +1,26 @@
 """ Straight waveguide rounding algorithms"""
 from functools import lru_cache
-from math import atan2, tan, inf
+from math import sin, cos, tan, atan, atan2, acos, pi, sqrt, hypot, copysign, isclose, inf
 from typing import List, Tuple
 import warnings
 import numpy as np
 import klayout.db as kdb
 from numpy.core.fromnumeric import trace
-from zeropdk.layout.geometry import rotate, fix_angle, cross_prod
-from zeropdk.layout.algorithms.sampling import sample_function
+from zeropdk.layout.geometry import rotate, fix_angle
 from zeropdk.layout.polygons import layout_path
 from zeropdk.layout.waveguides import layout_waveguide
 from zeropdk.exceptions import ZeroPDKUserError, ZeroPDKWarning
 
+def _cross(a, b):
+    """Cross product of two point-likes, without building klayout objects."""
+    return a.x * b.y - a.y * b.x
+
+
+def _dot(a, b):
+    """Dot product of two point-likes, without building klayout objects."""
+    return a.x * b.x + a.y * b.y
+
+
 def angle_between(v1, v0):
     """Compute angle in radians between v1 and v0.
     Rotation angle from v0 to v1 counter-clockwise.
@@ -21,11 +30,9 @@ def angle_between(v1, v0):
 
 def project(P, A, B):
     """Projects a point P into a line defined by A and B"""
-    AB = B - A
-    eAB = AB / AB.norm()
-
-    Pproj = A + (P - A) * eAB * eAB
-    return Pproj
+    abx, aby = B.x - A.x, B.y - A.y
+    t = ((P.x - A.x) * abx + (P.y - A.y) * aby) / (abx * abx + aby * aby)
+    return A.__class__(A.x + t * abx, A.y + t * aby)
 
 
 def bisect(V1, V2):
@@ -33,8 +40,10 @@ def bisect(V1, V2):
 
     # from https://math.stackexchange.com/questions/2285965/how-to-find-the-vector-formula-for-the-bisector-of-given-two-vectors
 
-    V = V1.norm() * V2 + V2.norm() * V1
-    return V / V.norm()
+    n1, n2 = hypot(V1.x, V1.y), hypot(V2.x, V2.y)
+    vx, vy = n1 * V2.x + n2 * V1.x, n1 * V2.y + n2 * V1.y
+    n = hypot(vx, vy)
+    return V1.__class__(vx / n, vy / n)
 
 
 def intersect(A, eA, B, eB):
@@ -42,32 +51,43 @@ def intersect(A, eA, B, eB):
 
     # from http://mathforum.org/library/drmath/view/62814.html
 
-    assert abs(cross_prod(eA, eB)) > 0, "Vectors must not be parallel"
+    cross = _cross(eA, eB)
+    assert abs(cross) > 0, "Vectors must not be parallel"
 
-    a = cross_prod(B - A, eB) / cross_prod(eA, eB)
-    return A + a * eA
+    a = ((B.x - A.x) * eB.y - (B.y - A.y) * eB.x) / cross
+    return A.__class__(A.x + a * eA.x, A.y + a * eA.y)
+
+
+@lru_cache(maxsize=1024)
+def _arc_geom(angle_rad):
+    """Trigonometry of a tangent arc given a vertex angle.
+
+    Returns (tan(angle/2), 1/cos(angle/2)**2). Vertex angles repeat a lot
+    (90 degrees, 45 degrees...), so this is cached.
+    """
+    return tan(angle_rad / 2), 1 / cos(angle_rad / 2) ** 2
 
 
-@lru_cache(maxsize=5)
 def _min_clearance(angle_rad, radius):
     """Compute the minimum clearance for a tangent arc given an vertex angle."""
+    tan_half, _ = _arc_geom(angle_rad)
     try:
-        return abs(radius / tan(angle_rad / 2))
+        return abs(radius / tan_half)
     except ZeroDivisionError:
         return inf
 
 
-def _solve_Z_angle(α1, α2, BC, R):
-    from math import sin, cos, tan, atan, acos
-
-    assert α1 * α2  # they should have the same sign
-    sign = α1 / abs(α1)
+def _solve_Z_angle(sin1, cos1, sin2, cos2, BC, R):
+    """Angle γ of the Z-turn, given sines and cosines of its two vertex angles."""
+    assert sin1 * sin2  # they should have the same sign
+    sign = copysign(1, sin1)
 
-    α1, α2 = abs(α1), abs(α2)
+    # sin(abs(α)) = abs(sin(α)) and cos(abs(α)) = cos(α) for α in [-pi, pi]
+    sin1, sin2 = abs(sin1), abs(sin2)
 
-    αprime = atan(0.5 / tan(α1) + 0.5 / tan(α2))
+    αprime = atan(0.5 * cos1 / sin1 + 0.5 * cos2 / sin2)
     A = 2 / cos(αprime)
-    γ = -αprime + acos(1 / A * (1 / sin(α1) + 1 / sin(α2) - BC / R))
+    γ = -αprime + acos(1 / A * (1 / sin1 + 1 / sin2 - BC / R))
 
     return γ * sign
 
@@ -82,52 +102,66 @@ class ClearanceForward(Exception):
 
 class _Arc:
     def __init__(self, P1, C, P2, ccw):
-        from math import isclose
-
-        assert isclose(
-            (P2 - C).norm(), (P1 - C).norm(), abs_tol=1e-9
-        ), "Invalid Arc"  # inconsistent radius
+        r1 = hypot(P1.x - C.x, P1.y - C.y)
+        r2 = hypot(P2.x - C.x, P2.y - C.y)
+        assert isclose(r2, r1, abs_tol=1e-9), "Invalid Arc"  # inconsistent radius
         self.P1 = P1  # first point
         self.C = C  # center
         self.P2 = P2  # second point
         self.ccw = ccw  # True if counter-clockwise
+        self._xy = None
 
-    def get_points(self):
-        from math import atan2, pi
-
-        P1, C, P2 = self.P1, self.C, self.P2
-
-        r = (P2 - C).norm()
-
-        theta_start = atan2((P1 - C).y, (P1 - C).x)
-        theta_end = atan2((P2 - C).y, (P2 - C).x)
-        if self.ccw:
+        # sampling angles, ordered so that theta_start < theta_end.
+        # clockwise arcs are sampled from P2 to P1 and reversed.
+        theta_start = atan2(P1.y - C.y, P1.x - C.x)
+        theta_end = atan2(P2.y - C.y, P2.x - C.x)
+        if ccw:
             theta_end = (theta_end - theta_start) % (2 * pi) + theta_start
         else:
             theta_start = (theta_start - theta_end) % (2 * pi) + theta_end
             theta_start, theta_end = theta_end, theta_start
+        self.radius = r2
+        self.theta_start = theta_start
+        self.theta_end = theta_end
+        self.reverse = not ccw
 
-        arc_function = lambda t: np.array([r * np.cos(t), r * np.sin(t)])
-
-        # in the function below, theta_start must be smaller than theta_end
-        t, coords = sample_function(arc_function, [theta_start, theta_end], tol=0.002 / r)
+    def get_points(self):
+        return [kdb.DPoint(x, y) for x, y in self.get_xy().tolist()]
+
+    def get_xy(self):
+        """Sampled arc as an (N, 2) array of coordinates."""
+        # arcs can be traversed several times (e.g. when tapering), sample them once
+        if self._xy is None:
+            self._xy = self._compute_xy()
+        return self._xy
+
+    def _compute_xy(self):
+        C = self.C
+        r = self.radius
+        theta_start, theta_end = self.theta_start, self.theta_end
+
+        # Sample the arc uniformly. A step of dtheta keeps the sagitta
+        # (distance between chord and arc) below 0.2nm: s ~= r * dtheta**2 / 8
+        dtheta = sqrt(8 * 0.0002 / r)
+        n_points = max(int(np.ceil((theta_end - theta_start) / dtheta)) + 1, 2)
+        t = np.linspace(theta_start, theta_end, n_points)
 
         # This yields a better polygon
         # The idea is to place a point right after the first one, to
-        # make sure the arc starts in the right direction
-        insert_at = np.argmax(theta_start + 0.001 <= t)
-        t = np.insert(t, insert_at, theta_start + 0.001)
-        coords = np.insert(coords, insert_at, arc_function(theta_start + 0.001), axis=1)
-        insert_at = np.argmax(theta_end - 0.001 <= t)
-        coords = np.insert(
-            coords, insert_at, arc_function(theta_end - 0.001), axis=1
-        )  # finish the waveguide a little bit after
+        # make sure the arc starts in the right direction,
+        # and another one right before the last one.
+        guard_start, guard_end = theta_start + 0.001, theta_end - 0.001
+        if guard_start < guard_end:
+            i1, i2 = np.searchsorted(t, (guard_start, guard_end))
+            t = np.concatenate((t[:i1], [guard_start], t[i1:i2], [guard_end], t[i2:]))
 
         # create original waveguide poligon prior to clipping and rotation
-        dpoints_list = [C + kdb.DPoint(x, y) for x, y in zip(*coords)]
-        if not self.ccw:
-            dpoints_list = list(reversed(dpoints_list))
-        return dpoints_list
+        xy = np.empty((len(t), 2))
+        xy[:, 0] = C.x + r * np.cos(t)
+        xy[:, 1] = C.y + r * np.sin(t)
+        if self.reverse:
+            xy = xy[::-1]
+        return xy
 
     def __repr__(self):
         return "Arc({P1}, {C}, {P2}, {CCW})".format(P1=self.P1, C=self.C, P2=self.P2, CCW=self.ccw)
@@ -141,6 +175,9 @@ class _Line:
     def get_points(self):
         return [self.P1, self.P2]
 
+    def get_xy(self):
+        return np.array([(self.P1.x, self.P1.y), (self.P2.x, self.P2.y)])
+
     def get_length(self):
         return (self.P2 - self.P1).norm()
 
@@ -149,36 +186,46 @@ class _Line:
 
 
 def solve_Z(A, B, C, D, radius):
-    from math import sin, pi, copysign
-
     AB = B - A
     BC = C - B
     CD = D - C
 
-    α1 = angle_between(-BC, AB)
-    α2 = angle_between(-BC, CD)
+    # sines and cosines of α1 = angle_between(-BC, AB)
+    # and α2 = angle_between(-BC, CD), from cross and dot products
+    ab, bc, cd = hypot(AB.x, AB.y), hypot(BC.x, BC.y), hypot(CD.x, CD.y)
+    sin1 = _cross(BC, AB) / (ab * bc)
+    cos1 = -_dot(AB, BC) / (ab * bc)
+    sin2 = _cross(BC, CD) / (cd * bc)
+    cos2 = -_dot(CD, BC) / (cd * bc)
+    # the turn direction is the sign of the cross product.
+    # the magnitude of the angles only matters for the arc end points.
+    turn1 = 1 if sin1 > 0 else -1
+    turn2 = 1 if sin2 > 0 else -1
+    α1 = turn1 * acos(max(-1.0, min(1.0, cos1)))
+    α2 = turn2 * acos(max(-1.0, min(1.0, cos2)))
 
     # print("AB, BC, CD=", AB, BC, CD)
     # print("α1, α2=", degrees(α1), degrees(α2))
 
-    γ = _solve_Z_angle(α1, α2, BC.norm(), radius)
+    γ = _solve_Z_angle(sin1, cos1, sin2, cos2, bc, radius)
     # print("γ=", degrees(γ))
-    eX1X2 = rotate(-BC, -γ) / BC.norm()
+    eX1X2 = rotate(-BC, -γ) / bc
     # print("eX1X2=", eX1X2)
 
-    x = radius / BC.norm() * (1 - sin(abs(α1 - γ))) / sin(abs(α1))
+    # |α1 - γ| can exceed π, so sin(abs(α1 - γ)) may be negative
+    x = radius / bc * (1 - sin(abs(α1 - γ))) / abs(sin1)
     # print("x=", x)
     X = B + x * BC
     # print("X=", X)
     X1 = X - eX1X2 * radius
     X2 = X + eX1X2 * radius
 
-    Aprime = X1 + rotate(X - X1, copysign(pi / 2, α1) + γ - α1)
-    Dprime = X2 + rotate(X - X2, copysign(pi / 2, α2) + γ - α2)
+    Aprime = X1 + rotate(X - X1, turn1 * pi / 2 + γ - α1)
+    Dprime = X2 + rotate(X - X2, turn2 * pi / 2 + γ - α2)
 
     # Verify that Aprime starts after A. If not, throw error.
     # Verify that Dprime ends before D. If not, throw error.
-    if (Aprime - A) * AB < 0 or (D - Dprime) * CD < 0:
+    if _dot(Aprime - A, AB) < 0 or _dot(D - Dprime, CD) < 0:
         raise ZeroPDKUserError(f"Not enough space for Z-turn with radius {radius} on the following points: {[A, B, C, D]}")
 
 
@@ -188,7 +235,7 @@ def solve_Z(A, B, C, D, radius):
     # print("line", Dprime, D)
 
     return (
-        [_Line(A, Aprime), _Arc(Aprime, X1, X, α1 < 0), _Arc(X, X2, Dprime, α1 > 0)],
+        [_Line(A, Aprime), _Arc(Aprime, X1, X, turn1 < 0), _Arc(X, X2, Dprime, turn1 > 0)],
         [Dprime, D],
     )
 
@@ -200,7 +247,7 @@ def solve_U(A, B, C, D, radius):
     XB = bisect(A - B, C - B)
     XC = bisect(B - C, D - C)
 
-    orientation = cross_prod(XB, XC) > 0  # positive if CCW waveguide turn
+    orientation = _cross(XB, XC) > 0  # positive if CCW waveguide turn
 
     X = intersect(B, XB, C, XC)
 
@@ -234,8 +281,6 @@ def solve_U(A, B, C, D, radius):
     G = X + (Gprime - X) * radius / h
 
     def compute_A_prime(E, Eprime, eAB):
-        from math import sqrt
-
         D = (E - Eprime).norm()
         L = sqrt(D * (4 * radius - D))
         Aprime = Eprime - eAB * L
@@ -268,7 +313,7 @@ def solve_2(A, B):
 def solve_V(A, B, C, radius):
     XB = bisect(A - B, C - B)
 
-    isCCW = cross_prod(C - B, A - B) > 0
+    isCCW = _cross(C - B, A - B) > 0
 
     Aprime = project(A, B, XB + B)
     Cprime = project(C, B, XB + B)
@@ -284,16 +329,28 @@ def solve_V(A, B, C, radius):
         return [_Arc(A, Aprime, Asec, isCCW)], [Asec, C]
 
 
-def solve_3(A, B, C, radius):
-    from math import cos, pi
+def _solve_3_kernel(ax, ay, bx, by, cx, cy, radius):
+    """Float-only geometry of a rounded vertex A-B-C.
 
-    p0, p1, p2 = A, B, C
-    α = angle_between(p0 - p1, p2 - p1)
+    Returns None if the points are collinear, otherwise
+    ``(α, (center_x, center_y), (start_x, start_y), (end_x, end_y))``.
+    """
+    # This is called once per vertex, so the math below is done on floats.
+    # klayout point arithmetic is an order of magnitude slower.
 
-    from math import isclose
-    if isclose(α % (2 * pi), pi):
-        # if points are collinear, just ignore middle point
-        return ([], [p0, p2])
+    ux, uy = ax - bx, ay - by  # B -> A
+    vx, vy = cx - bx, cy - by  # B -> C
+    len1 = hypot(ux, uy)
+    len2 = hypot(vx, vy)
+
+    cross = vx * uy - vy * ux
+    dot = ux * vx + uy * vy
+    if dot < 0 and abs(cross) <= 1e-9 * len1 * len2:
+        # A, B and C are collinear and B is in the middle
+        return None
+
+    # same as angle_between(A - B, C - B)
+    α = atan2(cross, dot)
 
     # sometimes users pick len1 and len2 to be exactly 1 radius.
     # in that case, numerical errors might result in a ClearanceRewind
@@ -301,24 +358,39 @@ def solve_3(A, B, C, radius):
     # I am adding this 0.001 fix to correct that.
     clear = _min_clearance(α, radius - 0.001)
 
-    len1 = (p1 - p0).norm()
-    len2 = (p2 - p1).norm()
-
     if len1 < clear:
         raise ClearanceRewind()
     if len2 < clear:
         raise ClearanceForward()
 
-    e1 = (p1 - p0) / len1
-    e2 = (p2 - p1) / len2
+    e1x, e1y = (bx - ax) / len1, (by - ay) / len1
+    e2x, e2y = (cx - bx) / len2, (cy - by) / len2
+
+    k = 0.5 * clear * _arc_geom(α)[1]
+    return (
+        α,
+        (bx + (e2x - e1x) * k, by + (e2y - e1y) * k),
+        (bx - e1x * clear, by - e1y * clear),
+        (bx + e2x * clear, by + e2y * clear),
+    )
+
 
-    arc_center = p1 + 0.5 * (-e1 * clear + e2 * clear) / cos(α / 2) ** 2
+def solve_3(A, B, C, radius):
+    solution = _solve_3_kernel(A.x, A.y, B.x, B.y, C.x, C.y, radius)
+    if solution is None:
+        # if points are collinear, just ignore middle point
+        return ([], [A, C])
+
+    α, center, start, end = solution
+    arc_center = kdb.DPoint(*center)
+    arc_start = kdb.DPoint(*start)
+    arc_end = kdb.DPoint(*end)
     return (
         [
-            _Line(p0, p1 - e1 * clear),
-            _Arc(p1 - e1 * clear, arc_center, p1 + e2 * clear, α > 0),
+            _Line(A, arc_start),
+            _Arc(arc_start, arc_center, arc_end, α > 0),
         ],
-        [p1 + e2 * clear, p2],
+        [arc_end, C],
     )
 
 
@@ -327,10 +399,9 @@ def solve_4(A, B, C, D, radius):
     BC = C - B
     CD = D - C
 
-    α1 = angle_between(-BC, AB)
-    α2 = angle_between(-BC, CD)
-
-    if α1 * α2 > 0:
+    # angle_between(-BC, AB) and angle_between(-BC, CD) have the same sign
+    # exactly when these cross products do. Z-turns turn the same way twice.
+    if _cross(AB, BC) * _cross(CD, BC) > 0:
         return solve_Z(A, B, C, D, radius)
     else:
         return solve_U(A, B, C, D, radius)
@@ -374,26 +445,36 @@ def compute_rounded_path(points, radius):
 
     # Sanity checks
     assert N >= 3, "Insufficient number of points, N = {N} < 3".format(N=N)
-    old_rounded_path = rounded_path = list()
-    old_points_left = points_left = list(points)
+    rounded_path = list()
+
+    # The points left to solve are head + points_list[i:], where head holds
+    # the (at most two) points returned by the last solve. This avoids
+    # rebuilding the list of remaining points after every solve.
+    head, i = [], 0
+    # restore point before the last solve: (i, head, len(rounded_path))
+    restore = (i, head, 0)
+
+    def points_left(n):
+        """Returns (at most) the next n points left to solve."""
+        return head + points_list[i : i + n - len(head)]
 
     # condition to check if the last solve_3 was successful (can undo if necessary)
     can_rewind = False
-    while len(points_left) > 2:
+    while len(head) + N - i > 2:
         try:
-            solution, rest_points = solve_3(*points_left[0:3], radius)
-            old_points_left = points_left[:]
-            points_left = rest_points + points_left[3:]
+            solution, rest_points = solve_3(*points_left(3), radius)
+            restore = (i, head, len(rounded_path))
+            head, i = rest_points, i + 3 - len(head)
             can_rewind = True
         except ClearanceRewind:
             # Try going forward first, just in case. See stress tests below.
             forward_possible = False
-            if len(points_left[0:4]) >= 4:
+            if len(points_left(4)) >= 4:
                 forward_possible = True
                 try:
-                    solution, rest_points = solve_4(*points_left[0:4], radius)
-                    old_points_left = points_left[:]
-                    points_left = rest_points + points_left[4:]
+                    solution, rest_points = solve_4(*points_left(4), radius)
+                    restore = (i, head, len(rounded_path))
+                    head, i = rest_points, i + 4 - len(head)
                     can_rewind = False
                 except ZeroPDKUserError as e:
                     zeropdk_warn(f"`Tried to solve` Z curve, but couldn't fit. Error message: '{e}'. Fallback!", traceback=False)
@@ -401,38 +482,37 @@ def compute_rounded_path(points, radius):
             if not forward_possible:
                 if not can_rewind:
                     raise RuntimeError(
-                        "Not enough space to complete arcs in rounded waveguide: Cannot solve:", *points_left[0:3]
+                        "Not enough space to complete arcs in rounded waveguide: Cannot solve:", *points_left(3)
                     )
                 # Rewind: undo last rounded path element and try solve_4.
-                points_left = old_points_left
-                rounded_path = old_rounded_path
-                if len(points_left[0:4]) < 4:
+                i, head, path_length = restore
+                del rounded_path[path_length:]
+                if len(points_left(4)) < 4:
                     raise RuntimeError(
-                        "Not enough space to complete arcs in rounded waveguide: Cannot solve:", *points_left[0:4]
+                        "Not enough space to complete arcs in rounded waveguide: Cannot solve:", *points_left(4)
                     )
-                solution, rest_points = solve_4(*points_left[0:4], radius)
-                old_points_left = points_left[:]
-                points_left = rest_points + points_left[4:]
+                solution, rest_points = solve_4(*points_left(4), radius)
+                restore = (i, head, len(rounded_path))
+                head, i = rest_points, i + 4 - len(head)
                 can_rewind = False
         except ClearanceForward:
-            if len(points_left[0:4]) < 4:
+            if len(points_left(4)) < 4:
                 raise RuntimeError(
-                    "Not enough space to complete arcs in rounded waveguide: Cannot solve:", *points_left[0:4]
+                    "Not enough space to complete arcs in rounded waveguide: Cannot solve:", *points_left(4)
                 )
-            solution, rest_points = solve_4(*points_left[0:4], radius)
-            old_points_left = points_left[:]
-            points_left = rest_points + points_left[4:]
+            solution, rest_points = solve_4(*points_left(4), radius)
+            restore = (i, head, len(rounded_path))
+            head, i = rest_points, i + 4 - len(head)
             can_rewind = False
 
-        old_rounded_path = rounded_path[:]
         rounded_path += solution
 
-    # there should be 2 points left in points_left
-    solution, rest_points = solve_2(*points_left[0:2])
+    # there should be 2 points left
+    solution, rest_points = solve_2(*points_left(2))
     rounded_path += solution
-    points_left = rest_points + points_left[2:]
+    head, i = rest_points, i + 2 - len(head)
 
-    assert len(points_left) == 0
+    assert len(head) + N - i == 0
 
     return rounded_path
 
@@ -441,11 +521,20 @@ class _Path:
     """Object holding path plus width information"""
 
     def __init__(self, points, widths):
-        self.points = points
+        # points are kept as an (N, 2) array of coordinates. DPoints are only
+        # built on demand, since there can be hundreds of thousands of them.
+        if isinstance(points, np.ndarray):
+            self._xy = points
+        else:
+            self._xy = np.array([(p.x, p.y) for p in points], dtype=float).reshape(-1, 2)
 
         # This can be a single width or a list of widths, just like in layout_waveguide()
         self.widths = widths
 
+    @property
+    def points(self):
+        return [kdb.DPoint(x, y) for x, y in self._xy.tolist()]
+
     def layout(self, cell, layer):
         layout_waveguide(cell, layer, self.points, self.widths, smooth=False)
 
@@ -462,8 +551,7 @@ class _Taper(_Path):
         self.w1 = w1
         self.w2 = w2
 
-        self.points = [P1, P2]
-        self.widths = [w1, w2]
+        super().__init__([P1, P2], [w1, w2])
 
     def __repr__(self):
         return "Taper({P1}, {P2}, w1={w1}, w2={w2})".format(
@@ -478,21 +566,24 @@ def _compute_tapered_line(line, waveguide_width, taper_width, taper_length):
 
     P1, P2 = line.get_points()
 
-    if line.get_length() < minimum_length:
+    dx, dy = P2.x - P1.x, P2.y - P1.y
+    sq_length = dx * dx + dy * dy
+    if sq_length < minimum_length * minimum_length:
         return [_Path([P1, P2], waveguide_width)]
 
-    u = P2 - P1
-    u /= u.norm()
+    k = taper_length / sq_length ** 0.5
+    step = kdb.DVector(dx * k, dy * k)
+    Q1, Q2 = P1 + step, P2 - step
 
     return [
-        _Taper(P1, P1 + u * taper_length, waveguide_width, taper_width),
-        _Path([P1 + u * taper_length, P2 - u * taper_length], taper_width),
-        _Taper(P2 - u * taper_length, P2, taper_width, waveguide_width),
+        _Taper(P1, Q1, waveguide_width, taper_width),
+        _Path([Q1, Q2], taper_width),
+        _Taper(Q2, P2, taper_width, waveguide_width),
     ]
 
 
 def compute_untapered_path(path, waveguide_width):
-    return [_Path(element.get_points(), waveguide_width) for element in path]
+    return [_Path(element.get_xy(), waveguide_width) for element in path]
 
 
 def compute_tapered_path(path, waveguide_width, taper_width, taper_length):
@@ -503,7 +594,7 @@ def compute_tapered_path(path, waveguide_width, taper_width, taper_length):
                 element, waveguide_width, taper_width, taper_length
             )
         elif isinstance(element, _Arc):
-            tapered_path += [_Path(element.get_points(), waveguide_width)]
+            tapered_path += [_Path(element.get_xy(), waveguide_width)]
 
     return tapered_path
 
@@ -553,34 +644,30 @@ def waveguide_from_points(
         waveguide_path = compute_untapered_path(rounded_path, width)
 
     # creating a single path
-    _draw_points = []
+    _draw_xy = []
     _draw_widths = []
     for element in waveguide_path:
-        points, width = element.points, element.widths
-        n_points = len(points)
-        try:
-            if len(width) == n_points:
-                _draw_points.extend(points)
-                _draw_widths.extend(width)
-            elif len(width) == 2:
-                _draw_widths.extend(np.linspace(width[0], width[1], n_points))
-                _draw_points.extend(points)
-            else:
-                raise RuntimeError("Internal error detected. Debug please.")
-        except TypeError:
-            _draw_points.extend(points)
-            _draw_widths.extend(np.ones(n_points) * width)
-
-    # deleting repeated points
-    _cur_point = None
-    _draw_points2 = []
-    _draw_widths2 = []
-    for p, w in zip(_draw_points, _draw_widths):
-        if _cur_point and p == _cur_point:
-            continue
-        _draw_points2.append(p)
-        _draw_widths2.append(w)
-        _cur_point = p
+        xy, width = element._xy, element.widths
+        n_points = len(xy)
+        if np.ndim(width) == 0:
+            w = np.full(n_points, width, dtype=float)
+        elif len(width) == n_points:
+            w = np.asarray(width, dtype=float)
+        elif len(width) == 2:
+            w = np.linspace(width[0], width[1], n_points)
+        else:
+            raise RuntimeError("Internal error detected. Debug please.")
+        _draw_xy.append(xy)
+        _draw_widths.append(w)
+
+    xy = np.concatenate(_draw_xy)
+    widths = np.concatenate(_draw_widths)
+
+    # deleting repeated points (with the same 1e-5 tolerance as DPoint.__eq__)
+    keep = np.ones(len(xy), dtype=bool)
+    keep[1:] = np.any(np.abs(np.diff(xy, axis=0)) >= 1e-5, axis=1)
+    _draw_points2 = [kdb.DPoint(x, y) for x, y in xy[keep].tolist()]
+    _draw_widths2 = widths[keep].tolist()
 
     return _draw_points2, _draw_widths2
 
@@ -9,35 +9,304 @@ TODO: enhance documentation
 TODO: make some of the functions in util use these.
 """
 
-from itertools import repeat
-from typing import List, Tuple
+from math import hypot, cos as _cos
 import numpy as np
 from numpy import cos, sin, pi, sqrt
-from functools import reduce
+# not used here anymore, but still re-exported by zeropdk.layout
 from zeropdk.layout.geometry import curve_length, cross_prod, find_arc
 from zeropdk.exceptions import ZeroPDKUserError
 
 import klayout.db as pya
 
+# zeropdk.layout re-exports these with a star import
+__all__ = [
+    "ZeroPDKUserError",
+    "cos",
+    "cross_prod",
+    "curve_length",
+    "debug",
+    "find_arc",
+    "layout_waveguide",
+    "layout_waveguide_angle",
+    "layout_waveguide_angle2",
+    "layout_waveguides",
+    "norm",
+    "np",
+    "pi",
+    "pya",
+    "sin",
+    "sqrt",
+    "waveguide_dpolygon",
+]
+
 debug = False
 
+def _norm(p):
+    return hypot(p.x, p.y)
+
+
 def norm(self):
-    return self.norm()
+    return _norm(self)
+
+def _extract_xy(points_list):
+    """Returns the coordinates of a list of points as two arrays, xs and ys."""
+    n = len(points_list)
+    xs = np.fromiter((p.x for p in points_list), dtype=float, count=n)
+    ys = np.fromiter((p.y for p in points_list), dtype=float, count=n)
+    return xs, ys
+
+
+def _cumulative_lengths(xs, ys):
+    """Returns the distance along a polyline at each vertex, and its total length."""
+    distance = np.zeros(len(xs))
+    np.cumsum(np.hypot(np.diff(xs), np.diff(ys)), out=distance[1:])
+    return distance, distance[-1]
+
+
+def _build_width_array(xs, ys, width):
+    """Returns the width at each vertex of a polyline, as a float array.
+
+    Args:
+        xs, ys: coordinates of the vertices
+        width: constant, 2-element list, or list.
+            If 2-element list, then widths are interpolated along the polyline.
+            If list, then it has to either have the same length as points.
+    """
+    N = len(xs)
+    if np.ndim(width) == 0:
+        return np.full(N, width, dtype=float)
+    elif len(width) == N:
+        return np.array(width, dtype=float)
+    elif len(width) == 2:
+        # assume width[0] is initial width and
+        # width[1] is final width
+        # interpolate with the distance along the polyline
+        distance, length = _cumulative_lengths(xs, ys)
+        if length > 0:
+            distance /= length
+        return width[0] + (width[1] - width[0]) * distance
+    else:
+        return np.full(N, width[0], dtype=float)
+
+
+def _circumcenters(ax, ay, bx, by, cx, cy):
+    """Centers of the circles through points A, B and C, given as coordinate arrays.
+
+    Returns (ox, oy, valid). valid is False where A, B, C are collinear,
+    with the same tolerance as geometry.find_arc.
+    """
+    abx, aby = bx - ax, by - ay
+    acx, acy = cx - ax, cy - ay
+    valid = np.abs(abx * (cy - by) - aby * (cx - bx)) > 1e-8
+    d = np.where(valid, 2 * (abx * acy - aby * acx), 1.0)
+    ab2 = abx * abx + aby * aby
+    ac2 = acx * acx + acy * acy
+    return ax + (acy * ab2 - aby * ac2) / d, ay + (abx * ac2 - acx * ab2) / d, valid
+
+
+def _seg_intersect(ax, ay, dx, dy, b1x, b1y, b2x, b2y):
+    """Returns the point where segment b1-b2 crosses the line through a with direction d.
+
+    Returns None if it does not cross. Floating-point equivalent of
+    pya.DEdge(a, a + d).crossed_by(edge_b) and .crossing_point(edge_b), with the
+    same 1e-10 tolerance: an endpoint of b lying on the line is the crossing point.
+    """
+    d_norm = hypot(dx, dy)
+
+    c1 = dx * (b1y - ay) - dy * (b1x - ax)
+    if abs(c1) <= 1e-10 * (d_norm + hypot(b1x - ax, b1y - ay)):
+        return b1x, b1y
+    c2 = dx * (b2y - ay) - dy * (b2x - ax)
+    if abs(c2) <= 1e-10 * (d_norm + hypot(b2x - ax, b2y - ay)):
+        return b2x, b2y
+    if (c1 > 0) == (c2 > 0):
+        return None
+
+    t = c1 / (c1 - c2)
+    return b1x + (b2x - b1x) * t, b1y + (b2y - b1y) * t
+
+
+def _waveguide_segment(xs, ys, ws):
+    """Outline of a waveguide made of a single straight segment.
+
+    Same result as _waveguide_core followed by smoothing, since a
+    single segment has no corners.
+    """
+    dx, dy = xs[1] - xs[0], ys[1] - ys[0]
+    length = hypot(dx, dy)
+    nx, ny = -dy / length, dx / length
+    (x0, x1), (y0, y1) = xs.tolist(), ys.tolist()
+    h0, h1 = 0.5 * ws[0], 0.5 * ws[1]
+    return [
+        (x0 + h0 * nx, y0 + h0 * ny),
+        (x1 + h1 * nx, y1 + h1 * ny),
+        (x1 - h1 * nx, y1 - h1 * ny),
+        (x0 - h0 * nx, y0 - h0 * ny),
+    ]
+
+
+def _waveguide_core(xs, ys, ws, dbu):
+    """Computes both outlines of a waveguide, before smoothing.
+
+    Args:
+        xs, ys, ws: coordinates and widths of the vertices, as float arrays,
+            without consecutive duplicates (at least 2 vertices).
+        dbu: used for accuracy calculations.
+    Returns:
+        (points_high, points_low): lists of (x, y) tuples
+    """
+    N = len(xs)
+    points_high = list()
+    points_low = list()
 
-def _remove_duplicates(point_tuple_list: List[Tuple[pya.DPoint, ...]]) -> List[Tuple[pya.DPoint, ...]]:
-    """ Iterates through point_tuple_list and deletes entries with consecutive duplicate points."""
+    # Offset points are computed for all segments at once.
+    # Segment i goes from vertex i to vertex i + 1. Its offset points are
+    # start_high[i], end_high[i] on one side and start_low[i], end_low[i]
+    # on the other.
+    half_widths = 0.5 * ws
+    dxs, dys = np.diff(xs), np.diff(ys)
+    thetas = np.arctan2(dys, dxs)
+    lengths = np.hypot(dxs, dys)
+    xy = np.stack([xs, ys], axis=1)
+    # cos(theta + pi/2) = -sin(theta), sin(theta + pi/2) = cos(theta)
+    cos_t, sin_t = cos(thetas), sin(thetas)
+    normal_high = np.stack([-sin_t, cos_t], axis=1)
+    normal_low = -normal_high
+    start_high = (xy[:-1] + half_widths[:-1, None] * normal_high).tolist()
+    end_high = (xy[1:] + half_widths[1:, None] * normal_high).tolist()
+    start_low = (xy[:-1] + half_widths[:-1, None] * normal_low).tolist()
+    end_low = (xy[1:] + half_widths[1:, None] * normal_low).tolist()
+
+    # At each interior vertex i, segment i - 1 comes in and segment i leaves.
+    # Based on these, there are two algorithms available:
+    # 1. arc algorithm. it detects you are trying to draw an arc
+    # so it will compute the center and radius of that arc and
+    # layout accordingly.
+    # 2. linear trace algorithm. it is not an arc, and you want
+    # straight lines with sharp corners.
+
+    # cosine of the angle between delta_next and delta_prev
+    # ensure it's between -1 and 1 (nontrivial numerically)
+    cos_dd = np.clip((dxs[1:] * dxs[:-1] + dys[1:] * dys[:-1]) / lengths[1:] / lengths[:-1], -1, 1)
+
+    # to detect an arc, the points need to go in the same direction
+    # and the width has to be bigger than the smallest distance between
+    # two points. The three points must also not be collinear.
+    is_arc = (cos_dd > _cos(30 * pi / 180)) & (np.minimum(lengths[1:], lengths[:-1]) < ws[1:-1])
+    arc_high = np.zeros((len(cos_dd), 2))
+    arc_low = np.zeros((len(cos_dd), 2))
+    (k,) = np.nonzero(is_arc)
+    if len(k):
+        # (prev, vertex, next) points around each interior vertex
+        (ax, ay), (bx, by), (cx, cy) = xy[k].T, xy[k + 1].T, xy[k + 2].T
+        ox, oy, valid = _circumcenters(ax, ay, bx, by, cx, cy)
+        is_arc[k[~valid]] = False
+        ray = np.stack([bx - ox, by - oy], axis=1)
+        ray /= np.hypot(ray[:, 0], ray[:, 1])[:, None]
+        # if orientation is positive, the arc is going counterclockwise
+        orientation = np.where(ray[:, 0] * dys[k] - ray[:, 1] * dxs[k] > 0, 1, -1)
+        offset = (orientation * ws[k + 1] / 2)[:, None] * ray
+        vertex = np.stack([bx, by], axis=1)
+        arc_low[k] = vertex + offset
+        arc_high[k] = vertex - offset
+
+    # change in direction at each interior vertex, in the -pi to pi range
+    turns = (np.remainder(np.diff(thetas) + pi, 2 * pi) - pi).tolist()
+
+    is_arc = is_arc.tolist()
+    arc_high, arc_low = arc_high.tolist(), arc_low.tolist()
+    cos_dd = cos_dd.tolist()
+    ws = ws.tolist()
+
+    points_high.append(tuple(start_high[0]))
+    points_low.append(tuple(start_low[0]))
 
-    if len(point_tuple_list) < 2:
-        return point_tuple_list
+    for i in range(1, N - 1):
+        if is_arc[i - 1]:  # algorithm 1
+            points_low.append(tuple(arc_low[i - 1]))
+            points_high.append(tuple(arc_high[i - 1]))
+        else:  # algorithm 2
+            width, turn = ws[i], turns[i - 1]
+
+            # High point decision
+            (fx, fy), (nx, ny) = start_high[i], end_high[i]
+            (bx, by), (px, py) = end_high[i - 1], start_high[i - 1]
+            crossing = _seg_intersect(fx, fy, nx - fx, ny - fy, bx, by, px, py)
+            if crossing is not None:
+                points_high.append(crossing)
+            elif width * (1 - cos_dd[i - 1]) > dbu and turn < 0:
+                points_high.append((bx, by))
+                points_high.append((fx, fy))
+            else:
+                points_high.append(((bx + fx) * 0.5, (by + fy) * 0.5))
+
+            # Low point decision
+            (fx, fy), (nx, ny) = start_low[i], end_low[i]
+            (bx, by), (px, py) = end_low[i - 1], start_low[i - 1]
+            crossing = _seg_intersect(fx, fy, nx - fx, ny - fy, bx, by, px, py)
+            if crossing is not None:
+                points_low.append(crossing)
+            elif width * (1 - cos_dd[i - 1]) > dbu and turn > 0:
+                points_low.append((bx, by))
+                points_low.append((fx, fy))
+            else:
+                points_low.append(((bx + fx) * 0.5, (by + fy) * 0.5))
 
-    unique_points = [point_tuple_list[0]]
-    previous_point = point_tuple_list[0]
-    for p_tuple in point_tuple_list[1:]:
-        if (p_tuple[0] - previous_point[0]).norm() > 0:
-            unique_points.append(p_tuple)
-            previous_point = p_tuple
+    # the last point is only added if it is ahead of the previous one
+    dx, dy = dxs[-1], dys[-1]
+    for points, (fx, fy) in ((points_high, end_high[-1]), (points_low, end_low[-1])):
+        if (fx - points[-1][0]) * dx + (fy - points[-1][1]) * dy > 0:
+            points.append((fx, fy))
+
+    return points_high, points_low
+
+
+def _smooth_append(point_list, point, dbu, smooth, cos130_sq=_cos(130 / 180 * pi) ** 2):
+    """Appends point to point_list, in place.
+
+    Points are (x, y) tuples.
+    Append point only if the area of the triangle built with
+    neighboring edges is above a certain threshold.
+    In addition, if smooth is true:
+    Append point only if change in direction is less than 130 degrees.
+    """
+    if len(point_list) < 1:
+        point_list.append(point)
+        return
+
+    x, y = point
+    x1, y1 = point_list[-1]
+    curr_x, curr_y = x - x1, y - y1
+    curr_sqr_norm = curr_x * curr_x + curr_y * curr_y
+    if len(point_list) < 2:
+        if curr_sqr_norm > 0:
+            point_list.append(point)
+        return
+
+    if curr_sqr_norm > 0:
+        x0, y0 = point_list[-2]
+        prev_x, prev_y = x1 - x0, y1 - y0
+
+        # Only add new point if the area of the triangle built with
+        # current edge and previous edge is greater than dbu^2/2
+        if abs(prev_x * curr_y - prev_y * curr_x) > dbu**2 / 2:
+            if smooth:
+                # avoid corners when smoothing.
+                # same as cos(angle) > cos(130 deg), without square roots.
+                prev_sqr_norm = prev_x * prev_x + prev_y * prev_y
+                dot = curr_x * prev_x + curr_y * prev_y
+                if dot >= 0 or dot * dot < cos130_sq * curr_sqr_norm * prev_sqr_norm:
+                    point_list.append(point)
+                elif curr_sqr_norm > prev_sqr_norm:
+                    # edge case when there is prev_edge is small and
+                    # needs to be deleted to get rid of the corner
+                    point_list[-1] = point
+            else:
+                point_list.append(point)
+        # avoid unnecessary points
+        else:
+            point_list[-1] = point
 
-    return unique_points
 
 def waveguide_dpolygon(points_list, width, dbu, smooth=True):
     """Returns a polygon outlining a waveguide.
@@ -57,229 +326,44 @@ def waveguide_dpolygon(points_list, width, dbu, smooth=True):
         polygon DPoints
 
     """
-    if len(points_list) < 2:
-        raise NotImplementedError("ERROR: Not enough points to draw a waveguide.")
-        return
+    xs, ys = _extract_xy(points_list)
+    return _waveguide_dpolygon_xy(xs, ys, width, dbu, smooth)
 
-    # Prepares a joint point and width iterators
-    try:
-        if len(width) == len(points_list):
-            width_iterator = iter(width)
-        elif len(width) == 2:
-            # assume width[0] is initial width and
-            # width[1] is final width
-            # interpolate with points_list
-            L = curve_length(points_list)
-            distance = 0
-            widths_list = [width[0]]
-            widths_func = lambda t: (1 - t) * width[0] + t * width[1]
-            old_point = points_list[0]
-            for point in points_list[1:]:
-                distance += norm(point - old_point)
-                old_point = point
-                widths_list.append(widths_func(distance / L))
-            width_iterator = iter(widths_list)
-        else:
-            width_iterator = repeat(width[0])
-    except TypeError:
-        width_iterator = repeat(width)
-    finally:
-        points_iterator = iter(points_list)
-
-    points_low = list()
-    points_high = list()
 
-    def cos_angle(point1, point2):
-        cos_angle = point1 * point2 / norm(point1) / norm(point2)
-
-        # ensure it's between -1 and 1 (nontrivial numerically)
-        if abs(cos_angle) > 1:
-            return cos_angle / abs(cos_angle)
-        else:
-            return cos_angle
+def _waveguide_dpolygon_xy(xs, ys, width, dbu, smooth):
+    """Same as waveguide_dpolygon, with the points given as coordinate arrays."""
+    if len(xs) < 2:
+        raise NotImplementedError("ERROR: Not enough points to draw a waveguide.")
 
-    def sin_angle(point1, point2):
-        return cross_prod(point1, point2) / norm(point1) / norm(point2)
+    ws = _build_width_array(xs, ys, width)
 
-    point_width_list = list(zip(points_iterator, width_iterator))
     # Remove duplicate consecutive points here, because it would create
     # problems for the algorithm below.
-    point_width_list = _remove_duplicates(point_width_list)
-    N = len(point_width_list)
+    keep = np.ones(len(xs), dtype=bool)
+    keep[1:] = (np.diff(xs) != 0) | (np.diff(ys) != 0)
+    xs, ys, ws = xs[keep], ys[keep], ws[keep]
+    N = len(xs)
 
     if N < 2:
         raise ZeroPDKUserError("Error: Attempted to layout a zero-length waveguide.")
 
-    first_point, first_width = point_width_list[0]
-    next_point, next_width = point_width_list[1]
-
-    delta = next_point - first_point
-    theta = np.arctan2(delta.y, delta.x)
-    first_high_point = first_point + 0.5 * first_width * pya.DPoint(
-        cos(theta + pi / 2), sin(theta + pi / 2)
-    )
-    first_low_point = first_point + 0.5 * first_width * pya.DPoint(
-        cos(theta - pi / 2), sin(theta - pi / 2)
-    )
-    points_high.append(first_high_point)
-    points_low.append(first_low_point)
+    if N == 2:
+        polygon_points = _waveguide_segment(xs, ys, ws)
+        return pya.DSimplePolygon([pya.DPoint(x, y) for x, y in polygon_points])
 
-    for i in range(1, N - 1):
-        prev_point, prev_width = point_width_list[i - 1]
-        point, width = point_width_list[i]
-        next_point, next_width = point_width_list[i + 1]
-        delta_prev = point - prev_point
-        delta_next = next_point - point
-
-        # based on these points, there are two algorithms available:
-        # 1. arc algorithm. it detects you are trying to draw an arc
-        # so it will compute the center and radius of that arc and
-        # layout accordingly.
-        # 2. linear trace algorithm. it is not an arc, and you want
-        # straight lines with sharp corners.
-
-        # to detect an arc, the points need to go in the same direction
-        # and the width has to be bigger than the smallest distance between
-        # two points.
-
-        is_small = min(delta_next.norm(), delta_prev.norm()) < width
-        is_arc = cos_angle(delta_next, delta_prev) > cos(30 * pi / 180)
-        is_arc = is_arc and is_small
-        center_arc, radius = find_arc(prev_point, point, next_point)
-        if is_arc and radius < np.inf:  # algorithm 1
-            ray = point - center_arc
-            ray /= ray.norm()
-            # if orientation is positive, the arc is going counterclockwise
-            orientation = (cross_prod(ray, delta_prev) > 0) * 2 - 1
-            points_low.append(point + orientation * width * ray / 2)
-            points_high.append(point - orientation * width * ray / 2)
-        else:  # algorithm 2
-            theta_prev = np.arctan2(delta_prev.y, delta_prev.x)
-            theta_next = np.arctan2(delta_next.y, delta_next.x)
-
-            next_point_high = next_point + 0.5 * next_width * pya.DPoint(
-                cos(theta_next + pi / 2), sin(theta_next + pi / 2)
-            )
-            next_point_low = next_point + 0.5 * next_width * pya.DPoint(
-                cos(theta_next - pi / 2), sin(theta_next - pi / 2)
-            )
-
-            forward_point_high = point + 0.5 * width * pya.DPoint(
-                cos(theta_next + pi / 2), sin(theta_next + pi / 2)
-            )
-            forward_point_low = point + 0.5 * width * pya.DPoint(
-                cos(theta_next - pi / 2), sin(theta_next - pi / 2)
-            )
-
-            prev_point_high = prev_point + 0.5 * prev_width * pya.DPoint(
-                cos(theta_prev + pi / 2), sin(theta_prev + pi / 2)
-            )
-            prev_point_low = prev_point + 0.5 * prev_width * pya.DPoint(
-                cos(theta_prev - pi / 2), sin(theta_prev - pi / 2)
-            )
+    points_high, points_low = _waveguide_core(xs, ys, ws, dbu)
 
-            backward_point_high = point + 0.5 * width * pya.DPoint(
-                cos(theta_prev + pi / 2), sin(theta_prev + pi / 2)
-            )
-            backward_point_low = point + 0.5 * width * pya.DPoint(
-                cos(theta_prev - pi / 2), sin(theta_prev - pi / 2)
-            )
-
-            fix_angle = lambda theta: ((theta + pi) % (2 * pi)) - pi
-
-            # High point decision
-            next_high_edge = pya.DEdge(forward_point_high, next_point_high)
-            prev_high_edge = pya.DEdge(backward_point_high, prev_point_high)
-
-            if next_high_edge.crossed_by(prev_high_edge):
-                intersect_point = next_high_edge.crossing_point(prev_high_edge)
-                points_high.append(intersect_point)
-            else:
-                cos_dd = cos_angle(delta_next, delta_prev)
-                if width * (1 - cos_dd) > dbu and fix_angle(theta_next - theta_prev) < 0:
-                    points_high.append(backward_point_high)
-                    points_high.append(forward_point_high)
-                else:
-                    points_high.append((backward_point_high + forward_point_high) * 0.5)
-
-            # Low point decision
-            next_low_edge = pya.DEdge(forward_point_low, next_point_low)
-            prev_low_edge = pya.DEdge(backward_point_low, prev_point_low)
-
-            if next_low_edge.crossed_by(prev_low_edge):
-                intersect_point = next_low_edge.crossing_point(prev_low_edge)
-                points_low.append(intersect_point)
-            else:
-                cos_dd = cos_angle(delta_next, delta_prev)
-                if width * (1 - cos_dd) > dbu and fix_angle(theta_next - theta_prev) > 0:
-                    points_low.append(backward_point_low)
-                    points_low.append(forward_point_low)
-                else:
-                    points_low.append((backward_point_low + forward_point_low) * 0.5)
-
-    last_point, last_width = point_width_list[-1]
-    point, width = point_width_list[-2]
-    delta = last_point - point
-    theta = np.arctan2(delta.y, delta.x)
-    final_high_point = last_point + 0.5 * last_width * pya.DPoint(
-        cos(theta + pi / 2), sin(theta + pi / 2)
-    )
-    final_low_point = last_point + 0.5 * last_width * pya.DPoint(
-        cos(theta - pi / 2), sin(theta - pi / 2)
-    )
-    if (final_high_point - points_high[-1]) * delta > 0:
-        points_high.append(final_high_point)
-    if (final_low_point - points_low[-1]) * delta > 0:
-        points_low.append(final_low_point)
-
-    # Append point only if the area of the triangle built with
-    # neighboring edges is above a certain threshold.
-    # In addition, if smooth is true:
-    # Append point only if change in direction is less than 130 degrees.
-
-    def smooth_append(point_list, point):
-        if len(point_list) < 1:
-            point_list.append(point)
-            return point_list
-        elif len(point_list) < 2:
-            curr_edge = point - point_list[-1]
-            if norm(curr_edge) > 0:
-                point_list.append(point)
-                return point_list
-
-        curr_edge = point - point_list[-1]
-        if norm(curr_edge) > 0:
-            prev_edge = point_list[-1] - point_list[-2]
-
-            # Only add new point if the area of the triangle built with
-            # current edge and previous edge is greater than dbu^2/2
-            if abs(cross_prod(prev_edge, curr_edge)) > dbu**2 / 2:
-                if smooth:
-                    # avoid corners when smoothing
-                    if cos_angle(curr_edge, prev_edge) > cos(130 / 180 * pi):
-                        point_list.append(point)
-                    elif norm(curr_edge) > norm(prev_edge):
-                        # edge case when there is prev_edge is small and
-                        # needs to be deleted to get rid of the corner
-                        point_list[-1] = point
-                else:
-                    point_list.append(point)
-            # avoid unnecessary points
-            else:
-                point_list[-1] = point
-        return point_list
-
-    if debug and False:
-        print("Points to be smoothed:")
-        for point, width in point_width_list:
-            print(point, width)
-
-    smooth_points_high = list(reduce(smooth_append, points_high, list()))
-    smooth_points_low = list(reduce(smooth_append, points_low, list()))
+    smooth_points_high = list()
+    for point in points_high:
+        _smooth_append(smooth_points_high, point, dbu, smooth)
+    smooth_points_low = list()
+    for point in points_low:
+        _smooth_append(smooth_points_low, point, dbu, smooth)
     # smooth_points_low = points_low
     # polygon_dpoints = points_high + list(reversed(points_low))
     # polygon_dpoints = list(reduce(smooth_append, polygon_dpoints, list()))
-    polygon_dpoints = smooth_points_high + list(reversed(smooth_points_low))
+    polygon_points = smooth_points_high + smooth_points_low[::-1]
+    polygon_dpoints = [pya.DPoint(x, y) for x, y in polygon_points]
     return pya.DSimplePolygon(polygon_dpoints)
 
 
@@ -299,12 +383,48 @@ def layout_waveguide(cell, layer, points_list, width, smooth=False):
 
     """
 
+    (dpolygon,) = layout_waveguides(cell, layer, [points_list], [width], smooth=smooth)
+    return dpolygon
+
+
+def layout_waveguides(cell, layer, list_of_points, list_of_widths, smooth=False):
+    """Lays out several waveguides (or traces) in one call.
+
+    Same as calling layout_waveguide for each pair of points_list and width,
+    but the coordinates of all waveguides are extracted in a single pass.
+
+    Args:
+        cell: cell to place into
+        layer: layer to place into. It is done with cell.shapes(layer).insert(pya.Polygon)
+        list_of_points: list of points_list, each a list of pya.DPoint (at least 2 points)
+        list_of_widths: list of widths (microns), one per points_list,
+            each as accepted by layout_waveguide.
+        smooth: tries to smooth final polygons to avoid very sharp edges (greater than 130 deg)
+    Returns:
+        list of polygons, one per waveguide
+
+    """
+    if len(list_of_points) != len(list_of_widths):
+        raise ZeroPDKUserError(
+            "Error: Got {} waveguides but {} widths.".format(
+                len(list_of_points), len(list_of_widths)
+            )
+        )
+
     dbu = cell.layout().dbu
 
-    dpolygon = waveguide_dpolygon(points_list, width, dbu, smooth=smooth)
-    dpolygon.compress(True)
-    dpolygon.layout(cell, layer)
-    return dpolygon
+    # flat coordinates of all waveguides. waveguide k spans offsets[k]:offsets[k + 1]
+    offsets = np.zeros(len(list_of_points) + 1, dtype=int)
+    np.cumsum([len(points_list) for points_list in list_of_points], out=offsets[1:])
+    xs, ys = _extract_xy([point for points_list in list_of_points for point in points_list])
+
+    dpolygons = list()
+    for start, end, width in zip(offsets[:-1].tolist(), offsets[1:].tolist(), list_of_widths):
+        dpolygon = _waveguide_dpolygon_xy(xs[start:end], ys[start:end], width, dbu, smooth)
+        dpolygon.compress(True)
+        dpolygon.layout(cell, layer)
+        dpolygons.append(dpolygon)
+    return dpolygons
 
 
 def layout_waveguide_angle(cell, layer, points_list, width, angle):
@@ -346,49 +466,17 @@ def layout_waveguide_angle2(cell, layer, points_list, width, angle_from, angle_t
         raise NotImplemented("ERROR: points_list too short")
         return
 
-    try:
-        if len(width) == len(points_list):
-            width_iterator = iter(width)
-        elif len(width) == 2:
-            # assume width[0] is initial width and
-            # width[1] is final width
-            # interpolate with points_list
-            L = curve_length(points_list)
-            distance = 0
-            widths_list = [width[0]]
-            widths_func = lambda t: (1 - t) * width[0] + t * width[1]
-            old_point = points_list[0]
-            for point in points_list[1:]:
-                distance += norm(point - old_point)
-                old_point = point
-                widths_list.append(widths_func(distance / L))
-            width_iterator = iter(widths_list)
-        else:
-            width_iterator = repeat(width[0])
-    except TypeError:
-        width_iterator = repeat(width)
-    finally:
-        points_iterator = iter(points_list)
-
-    points_low = list()
-    points_high = list()
-
-    point_width_list = list(zip(points_iterator, width_iterator))
-    N = len(point_width_list)
-
-    angle_list = list(np.linspace(angle_from, angle_to, N))
-
-    for i in range(0, N):
-        point, width = point_width_list[i]
-        angle = angle_list[i]
-        theta = angle * pi / 180
-
-        point_high = point + 0.5 * width * pya.DPoint(cos(theta + pi / 2), sin(theta + pi / 2))
-        points_high.append(point_high)
-        point_low = point + 0.5 * width * pya.DPoint(cos(theta - pi / 2), sin(theta - pi / 2))
-        points_low.append(point_low)
-
-    polygon_points = points_high + list(reversed(points_low))
+    xs, ys = _extract_xy(points_list)
+    half_widths = 0.5 * _build_width_array(xs, ys, width)
+    thetas = np.linspace(angle_from, angle_to, len(xs)) * pi / 180
+
+    # high points go forward, low points come back
+    # cos(theta + pi/2) = -sin(theta), sin(theta + pi/2) = cos(theta)
+    offset_x, offset_y = -half_widths * sin(thetas), half_widths * cos(thetas)
+    points_high = np.stack([xs + offset_x, ys + offset_y], axis=1)
+    points_low = np.stack([xs - offset_x, ys - offset_y], axis=1)
+    polygon_xy = np.concatenate([points_high, points_low[::-1]])
+    polygon_points = [pya.DPoint(x, y) for x, y in polygon_xy.tolist()]
 
     poly = pya.DSimplePolygon(polygon_points)
     cell.shapes(layer).insert(poly)
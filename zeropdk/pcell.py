@@ -3,14 +3,16 @@
 from collections import defaultdict
 import os
 import warnings
+import weakref
 import logging
+from math import pi
 from copy import copy, deepcopy
 from typing import Dict, List, Tuple, Any, Optional, Type
 from collections.abc import Mapping, MutableMapping
 
 import klayout.db as kdb
 from zeropdk.exceptions import ZeroPDKWarning
-from zeropdk.layout.geometry import rotate90
+from zeropdk.layout.geometry import rotate, rotate90
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,9 @@ TypePoint = kdb.DPoint
 TypeVector = kdb.DVector
 TypeLayer = kdb.LayerInfo
 
+# Marks a missing value where None is a valid one
+_MISSING = object()
+
 # I like using 'type' as argument names, but that conflicts with
 # python's keyword type
 python_type = type
@@ -42,6 +47,8 @@ class PCellParameter:
       choices     -> ([ [ d, v ], ...) choice descriptions/value for choice type
     """
 
+    __slots__ = ("name", "type", "description", "default", "unit", "readonly", "choices")
+
     def __init__(
         self,
         *,
@@ -77,21 +84,28 @@ class PCellParameter:
 
     def parse(self, value):
         """Makes sure that the value is of a certain type"""
-        if self.type is None:
+        expected_type = self.type
+        # fast path for the common case of a value of the exact type
+        value_type = type(value)
+        if value_type is expected_type:
+            return value
+        # ints are commonly given for float parameters
+        if expected_type is float and value_type is int:
+            return float(value)
+
+        if expected_type is None:
             new_type = type(value)
             self.type = new_type
             logger.warning(
-                "'{name}' type is unknown. Setting to '{typename}'".format(
-                    name=self.name, typename=new_type.__qualname__
-                )
+                "'%s' type is unknown. Setting to '%s'", self.name, new_type.__qualname__
             )
             return value
 
-        elif isinstance(value, self.type):
+        elif isinstance(value, expected_type):
             return value
 
         try:
-            return self.type(value)
+            return expected_type(value)
         except (TypeError, ValueError) as parse_exception:
             raise TypeError(
                 "Cannot set '{name}' to {value}. "
@@ -140,7 +154,8 @@ class objectview(MutableMapping):
         return self.orig_d.__len__()
 
     def __add__(self, other):
-        new_dict = copy(self.orig_d)
+        # update also accepts iterables of (key, value) pairs
+        new_dict = dict(self.orig_d)
         new_dict.update(other)
         return objectview(new_dict)
 
@@ -151,6 +166,47 @@ class objectview(MutableMapping):
         return f"objectview({repr(self.orig_d)})"
 
 
+class objectdict(dict):
+    """A dictionary whose values can also be read as attributes, dict.x
+
+    Unlike objectview, it owns its values. Dict methods take precedence
+    over keys with the same name: d.items is always the method, use
+    d["items"] to read such a key.
+    Use it for freshly built dictionaries, like in PCell.get_cell_params.
+
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        # only called when normal lookup fails, i.e. for non-method names
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __add__(self, other):
+        # update also accepts iterables of (key, value) pairs
+        new_dict = objectdict(self)
+        new_dict.update(other)
+        return new_dict
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __repr__(self):
+        return f"objectdict({dict.__repr__(self)})"
+
+
 # https://stackoverflow.com/questions/3387691/how-to-perfectly-override-a-dict
 # Mapping is an abstract class which implements a read-only dict
 class ParamContainer(Mapping):
@@ -168,8 +224,11 @@ class ParamContainer(Mapping):
     TypeError: Cannot set orange to string
     """
 
+    __slots__ = ("_container", "_current_values", "_revision")
     _container: Dict[str, PCellParameter]
     _current_values: Dict[str, PCellParameter]
+    # bumped on every change, so that PCell can tell when to merge again
+    _revision: int
 
     def __init__(self, *args):
         """Two ways of initializing:
@@ -177,20 +236,42 @@ class ParamContainer(Mapping):
         2. ParamContainer(param1, param2, param3, ...), where param is of type
             PCellParameter
         """
-        self._container = {}
-        self._current_values = {}
-
         if len(args) == 1 and isinstance(args[0], ParamContainer):
             param_container = args[0]
-            self._container = copy(param_container._container)
-            self._current_values = copy(param_container._current_values)
-        elif len(args) > 0:
+            self._container = {**param_container._container}
+            self._current_values = {**param_container._current_values}
+            self._revision = 0
+            return
+
+        self._container = {}
+        self._current_values = {}
+        self._revision = 0
+        if len(args) > 0:
             for arg in args:
                 param = arg  # TODO: check type
                 self.add_param(param)
 
+    def __copy__(self):
+        # built without __init__, in case subclasses change its signature
+        new_params = self.__class__.__new__(self.__class__)
+        new_params._container = {**self._container}
+        new_params._current_values = {**self._current_values}
+        new_params._revision = 0
+        # subclasses without __slots__ may carry extra attributes.
+        # (hasattr would fall back to __getattr__, which raises KeyError)
+        if type(self).__dictoffset__:
+            new_params.__dict__.update(self.__dict__)
+        return new_params
+
+    def __deepcopy__(self, memo):
+        # parameter definitions are shared, only values are deep-copied
+        new_params = self.__copy__()
+        new_params._current_values = deepcopy(self._current_values, memo)
+        return new_params
+
     def add_param(self, param: PCellParameter):
         self._container[param.name] = param
+        self._revision += 1
 
         # delete from current values if overwriting parameter
         if param.name in self._current_values:
@@ -198,47 +279,68 @@ class ParamContainer(Mapping):
         return param
 
     def __getattr__(self, name):
-        try:
-            value = self._current_values[name]
-        except KeyError:
-            value = self._container[name].default
-            self._current_values[name] = value
-
+        # only explicitly set values are stored; defaults are read from
+        # the parameter definition every time.
+        value = self._current_values.get(name, _MISSING)
+        if value is _MISSING:
+            return self._container[name].default
         return value
 
     def __setattr__(self, name, new_value):
         """Set a parameter instead of an instance attribute."""
 
-        protected_list = ("_container", "_current_values")
-        if name in protected_list:
-            return super().__setattr__(name, new_value)
-        param_def = self._container[name]
-        try:
-            parsed_value = param_def.parse(new_value)
-        except TypeError:
-            raise
-        self._current_values[name] = parsed_value
+        # the slots above are not parameters
+        if name in ParamContainer.__slots__:
+            return object.__setattr__(self, name, new_value)
+        self._set_known(self._container[name], new_value)
+
+    def _set_known(self, param_def: PCellParameter, new_value):
+        """Sets the value of param_def, which must belong to this container."""
+        self._current_values[param_def.name] = param_def.parse(new_value)
+        self._revision += 1
 
     def merge(self, other):
         if not isinstance(other, ParamContainer):
             raise TypeError("Object must be a ParamContainer")
 
-        # Make a copy of self
-        new_params = ParamContainer(self)
-        # Merge parameters, favoring other's values
-        for p in other._container.values():
-            new_params.add_param(p)
-        new_params._current_values.update(other._current_values)
+        # merging with an empty container is just a copy of the other one
+        if not self._container:
+            return ParamContainer(other)
+        if not other._container:
+            return ParamContainer(self)
+        return ParamContainer._merge_many((self, other))
+
+    @classmethod
+    def _merge_many(cls, param_containers):
+        """Merges several ParamContainers into a new one, favoring later ones.
+
+        Same as chaining merge calls, without the intermediate copies.
+        Unlike merge, the arguments are not type-checked: this is meant
+        for internal callers, which only pass ParamContainers.
+        """
+        new_params = cls()
+        container = new_params._container
+        current_values = new_params._current_values
+        for other in param_containers:
+            if not other._container:
+                continue
+            container.update(other._container)
+            # overwritten parameters lose their current value, like in add_param
+            for name in other._container:
+                current_values.pop(name, None)
+            current_values.update(other._current_values)
         return new_params
 
     # Methods necessary to override a read-only dict():
-    def __getitem__(self, key):
-        return self.__getattr__(key)
+    # same lookup as attribute access, without an extra method call
+    __getitem__ = __getattr__
 
     def __iter__(self):
-        values_dict = {p.name: p.default for p in self._container.values()}
-        values_dict.update(self._current_values)
-        return iter(values_dict)
+        # _current_values keys are always a subset of _container's
+        return iter(self._container)
+
+    def __contains__(self, key):
+        return key in self._container
 
     def __len__(self):
         return len(self._container)
@@ -247,6 +349,8 @@ class ParamContainer(Mapping):
 class Port(object):
     """Defines a port object"""
 
+    __slots__ = ("name", "position", "direction", "type", "width")
+
     def __init__(self, name, position, direction, width, port_type=None):
         self.name: str = name
         self.position: kdb.DPoint = position  # Point
@@ -254,6 +358,19 @@ class Port(object):
         self.type: str = port_type
         self.width: float = width
 
+    def __copy__(self):
+        # position and direction are mutable klayout objects,
+        # so they are duplicated instead of shared.
+        new_port = self.__class__.__new__(self.__class__)
+        for name in Port.__slots__:
+            setattr(new_port, name, getattr(self, name))
+        # subclasses without __slots__ may carry extra attributes
+        if hasattr(self, "__dict__"):
+            new_port.__dict__.update(self.__dict__)
+        new_port.position = self.position.dup()
+        new_port.direction = self.direction.dup()
+        return new_port
+
     def rename(self, new_name: str):
         self.name = new_name
         return self
@@ -272,14 +389,11 @@ class Port(object):
         return self
 
     def rotate(self, angle_deg: float):
-        from zeropdk.layout.geometry import rotate
-        from math import pi
-
         self.direction = rotate(self.direction, angle_deg * pi / 180)
         return self
 
-    def draw(self, cell: kdb.Cell, layer: kdb.LayerInfo):
-        """ Draws this port on cell's layer using klayout.db"""
+    def pin_shapes(self) -> Tuple[kdb.DPath, kdb.DSimplePolygon, kdb.DText]:
+        """Returns the shapes drawn by Port.draw: pin path, tip arrow and name."""
         if self.name.startswith("el"):
             pin_length = self.width
         else:
@@ -287,42 +401,40 @@ class Port(object):
             pin_length = min(2, self.width / 10)
 
         ex = self.direction
+        ey = rotate90(ex)
+        position = self.position
 
-        # Place a Path around the port pointing towards its exit
-        port_path = kdb.DPath(
-            [
-                self.position - 0.5 * pin_length * ex,
-                self.position + 0.5 * pin_length * ex,
-            ],
-            self.width,
-        )
-        cell.shapes(layer).insert(port_path)
+        # offsets along and across the port direction, computed once
+        ex_half = ex * (0.5 * pin_length)
+        ex_tip = ex * (0.4 * pin_length)
+        ey_side = ey * (0.1 * pin_length)
+        tip = position + ex_half
 
-        # Place a small arrow around the tip of the port
+        # A Path around the port pointing towards its exit
+        port_path = kdb.DPath([position - ex_half, tip], self.width)
 
-        ey = rotate90(ex)
-        port_tip = kdb.DSimplePolygon(
-            [
-                self.position + 0.5 * pin_length * ex,
-                self.position + 0.4 * pin_length * ex + 0.1 * pin_length * ey,
-                self.position + 0.4 * pin_length * ex - 0.1 * pin_length * ey,
-            ]
-        )
-        cell.shapes(layer).insert(port_tip)
+        # A small arrow around the tip of the port
+        arrow_base = position + ex_tip
+        port_tip = kdb.DSimplePolygon([tip, arrow_base + ey_side, arrow_base - ey_side])
         # pin_rectangle = rectangle(self.position, self.width,
         #                           pin_length, ex, ey)
-        # cell.shapes(layer).insert(pin_rectangle)
-
-        # Place a text object annotating the name of the port
-        cell.shapes(layer).insert(
-            kdb.DText(
-                self.name,
-                kdb.DTrans(kdb.DTrans.R0, self.position.x, self.position.y),
-                min(pin_length, 2),
-                0,
-            )
+
+        # A text object annotating the name of the port
+        port_text = kdb.DText(
+            self.name,
+            kdb.DTrans(kdb.DTrans.R0, position.x, position.y),
+            min(pin_length, 2),
+            0,
         )
 
+        return port_path, port_tip, port_text
+
+    def draw(self, cell: kdb.Cell, layer: kdb.LayerInfo):
+        """ Draws this port on cell's layer using klayout.db"""
+        shapes = cell.shapes(layer)
+        for shape in self.pin_shapes():
+            shapes.insert(shape)
+
         return self
 
 
@@ -359,16 +471,17 @@ def place_cell(
         if transform_into:
             # print(type(pcell))
             offset_transform = kdb.DTrans(kdb.DTrans.R0, -offset)
-            for instance in cell.each_inst():
-                instance.transform(offset_transform)
-            cell.transform_into(offset_transform)
+            # moves the shapes and the instances of cell in a single call
+            cell.transform(offset_transform)
         else:
             placement_origin = placement_origin - offset
     parent_cell.insert_cell(cell, placement_origin, 0)
 
-    new_ports = deepcopy(ports)
-    for port in new_ports.values():
-        port.position += port_offset
+    new_ports = dict()
+    for name, port in ports.items():
+        new_port = copy(port)
+        new_port.position = port.position + port_offset
+        new_ports[name] = new_port
 
     return new_ports
 
@@ -378,35 +491,59 @@ class PCell:
 
     # It is useful to define params and ports during class definition.
     # This way, inherited classes can inherit (and merge) these
-    # properties. The logic for this can be found in __new__ method
-    # below
+    # properties. The logic for this can be found in __init_subclass__
+    # method below
     params: ParamContainer = ParamContainer()
+    _merged_params: ParamContainer = params
+    _merged_revisions: Tuple[Tuple[ParamContainer, int], ...] = ()
+    _params_classes: Tuple[type, ...] = ()
     _cell: kdb.Cell
 
     def draw(self, cell: kdb.Cell) -> Tuple[kdb.Cell, Dict[str, Port]]:
         raise NotImplementedError()
 
-    def __new__(cls, *args, **kwargs):
+    def __init_subclass__(cls, **kwargs):
         # The purpose of this method is to make sure that the parameters
         # dictionary of the class is merged with the parameter dicts
         # of the classes from which this inherits.
+        # This is done once per class, when it is defined, and again
+        # if any of the params involved change afterwards (see __new__).
         # For now, accept conflicts. Be cafeful!
+        super().__init_subclass__(**kwargs)
 
-        obj = super().__new__(cls)
+        # The PCell classes whose params are merged, oldest first. Mixins
+        # that are not PCells have no params, hence the issubclass filter,
+        # which only runs here, once per class.
+        cls._params_classes = tuple(
+            klass for klass in reversed(cls.__mro__) if issubclass(klass, PCell)
+        )
+        cls._merge_params()
+
+    @classmethod
+    def _merge_params(cls):
+        # Collect all parent params, assuming they are all disjoint.
+        # _params_classes follows the MRO of this class in reverse order,
+        # since the newest class has the most up-to-date parameters
+        param_containers = [klass.params for klass in cls._params_classes]
+        cls._merged_params = ParamContainer._merge_many(param_containers)
+        cls._merged_revisions = tuple((params, params._revision) for params in param_containers)
+
+    @classmethod
+    def _merged_params_changed(cls):
+        """True if the params of cls or of its parents changed since the last merge."""
+        for klass, (params, revision) in zip(cls._params_classes, cls._merged_revisions):
+            if klass.params is not params or params._revision != revision:
+                return True
+        return False
 
-        # only consider subclasses
-        if cls != PCell and issubclass(cls, PCell):
-            # First, collect all parent params, assuming they are
-            # all disjoint
-            new_params = ParamContainer()
+    def __new__(cls, *args, **kwargs):
+        obj = super().__new__(cls)
 
-            # traverse the MRO of this class in reverse order,
-            # since the newest class has the most up-to-date parameters
-            for klass in reversed(cls.__mro__):
-                if issubclass(klass, PCell):
-                    new_params = new_params.merge(klass.params)
-            new_params = new_params.merge(cls.params)
-            obj.params = new_params
+        # each instance gets its own copy of the merged parameters
+        if cls is not PCell:
+            if cls._merged_params_changed():
+                cls._merge_params()
+            obj.params = ParamContainer(cls._merged_params)
 
         return obj
 
@@ -416,25 +553,25 @@ class PCell:
             self.set_param(**params)
 
     def set_param(self, **params):
+        cell_params = self.params
+        known_params = cell_params._container
         for name, p_value in params.items():
-            if name in self.params._container:
-                setattr(self.params, name, p_value)
+            param_def = known_params.get(name)
+            if param_def is not None:
+                cell_params._set_known(param_def, p_value)
             else:
                 logger.debug(
-                    "Ignoring '{name}' parameter in {klass}.".format(
-                        name=name, klass=self.__class__.__qualname__
-                    )
+                    "Ignoring '%s' parameter in %s.", name, self.__class__.__qualname__
                 )
 
     def get_cell_params(self):
         """returns a *copy* of the parameter dictionary
 
         Returns:
-            object: objectview of full parameter structure
+            object: objectdict of full parameter structure
             access with cp.name instead of cp['name']
         """
-        cell_params = dict(self.params)
-        return objectview(cell_params)
+        return objectdict(self.params)
 
     def new_cell(self, layout):
         new_cell = layout.create_cell(self.name)
@@ -478,7 +615,7 @@ class PCell:
         )
 
 
-_zeropdk_cache_store: Dict[Tuple[str, str, str], Dict[Tuple[str, str, kdb.Layout], kdb.Cell]] = defaultdict(dict)
+_zeropdk_cache_store: Dict[Tuple[str, str], Dict[Tuple[str, str, int], kdb.Cell]] = defaultdict(dict)
 
 
 def GDSCell(cell_name: str, filename: str, gds_dir: str) -> Type[PCell]:
@@ -501,20 +638,21 @@ def GDSCell(cell_name: str, filename: str, gds_dir: str) -> Type[PCell]:
         """Imports a gds file and places it."""
 
         # If we call GDSCell with the same parameters, we want the same cache.
-        _cell_cache = _zeropdk_cache_store[(cell_name, filename, gds_dir)]
+        _cell_cache = _zeropdk_cache_store[(cell_name, filepath)]
         _gds_cell_name = cell_name
 
         def __init__(self, name=cell_name, params=None):
             PCell.__init__(self, name=name, params=params)
 
         def get_gds_cell(self, layout: kdb.Layout) -> kdb.Cell:
-            filepath = os.path.join(gds_dir, filename)
+            # filepath is computed once, in GDSCell
             cell_name = self._gds_cell_name
 
-            # Attempt to read from cache first
-            if (cell_name, filepath, layout) in self._cell_cache:
-                gdscell = self._cell_cache[(cell_name, filepath, layout)]
-            else:
+            # Attempt to read from cache first.
+            # The layout is keyed by id so that the cache does not keep it alive.
+            cache_key = (cell_name, filepath, id(layout))
+            gdscell = self._cell_cache.get(cache_key)
+            if gdscell is None:
                 # Attempt to include cell_name into layout.
                 # KLayout will automatically prevent duplicate insertion.
                 gdscell = layout.read_cell(cell_name, filepath)
@@ -532,7 +670,9 @@ def GDSCell(cell_name: str, filename: str, gds_dir: str) -> Type[PCell]:
                 if layout.property(CACHE_PROP_ID) is not None:
                     cache_set |= set(layout.property(CACHE_PROP_ID).split(","))
                 layout.set_property(CACHE_PROP_ID, ",".join(cache_set))
-                self._cell_cache[(cell_name, filepath, layout)] = gdscell
+                self._cell_cache[cache_key] = gdscell
+                # forget the cell when the layout is destroyed, before its id is reused
+                weakref.finalize(layout, self._cell_cache.pop, cache_key, None)
             return gdscell
 
         def draw_gds_cell(self, cell: kdb.Cell) -> kdb.Cell:
@@ -559,5 +699,23 @@ def port_to_pin_helper(
 ):
     """ Draws port shapes for visual help in KLayout. """
 
+    dbu = cell.layout().dbu
+    # looked up with the first port: Cell.shapes creates missing layers
+    shapes = None
+
+    # Shapes.insert is slow for single shapes, so texts are
+    # collected and inserted all at once.
+    texts = kdb.Texts()
     for port in ports_list:
-        port.draw(cell, layerPinRec)
+        if type(port).draw is not Port.draw:
+            # subclasses may draw something else entirely
+            port.draw(cell, layerPinRec)
+            continue
+        if shapes is None:
+            shapes = cell.shapes(layerPinRec)
+        port_path, port_tip, port_text = port.pin_shapes()
+        shapes.insert(port_path)
+        shapes.insert(port_tip)
+        texts.insert(port_text.to_itype(dbu))
+    if not texts.is_empty():
+        shapes.insert(texts)
@@ -1,3 +1,9 @@
+from collections import defaultdict
+from functools import lru_cache
+import os
+from typing import Dict
+from xml.etree import ElementTree as ET
+
 import klayout.db as kdb
 
 
@@ -21,37 +27,8 @@ class Tech:
 
     @classmethod
     def load_from_xml(cls, lyp_filename):
-        import os
-
         lyp_filepath = os.path.realpath(lyp_filename)
-        with open(lyp_filepath, "r") as file:
-            layer_dict = xml_to_dict(file.read())["layer-properties"]["properties"]
-
-        layer_map = {}
-
-        for k in layer_dict:
-            layerInfo = k["source"].split("@")[0]
-            if "group-members" in k:
-                # encoutered a layer group, look inside:
-                j = k["group-members"]
-                if "name" in j:
-                    layerInfo_j = j["source"].split("@")[0]
-                    layer_map[j["name"]] = layerInfo_j
-                else:
-                    for j in k["group-members"]:
-                        layerInfo_j = j["source"].split("@")[0]
-                        layer_map[j["name"]] = layerInfo_j
-                if k["source"] != "*/*@*":
-                    layer_map[k["name"]] = layerInfo
-            else:
-                try:
-                    layer_map[k["name"]] = layerInfo
-                except TypeError as e:
-                    new_message = (
-                        f"Bad name for layer {layerInfo}. Check your .lyp XML file for errors."
-                    )
-
-                    raise TypeError(new_message) from e
+        layer_map = _cached_layer_map(lyp_filepath, os.stat(lyp_filepath).st_mtime_ns)
 
         # layer_map should contain values like '12/0'
         # 12 is the layer and 0 is the datatype
@@ -64,20 +41,58 @@ class Tech:
         return obj
 
 
-# XML functions
-
+@lru_cache(maxsize=32)
+def _cached_layer_map(lyp_filepath: str, mtime_ns: int) -> Dict[str, str]:
+    """Parsed .lyp files, keyed by (realpath, modification time).
 
-def etree_to_dict(t):
-    """XML to Dict parser
-    from: https://stackoverflow.com/questions/2148119/how-to-convert-an-xml-string-to-a-dictionary-in-python/10077069
+    Editing a file changes its modification time, so it is read again.
+    The returned dict is shared between calls and must not be modified.
     """
-    from collections import defaultdict
+    return _read_layer_map(lyp_filepath)
+
+
+def _read_layer_map(lyp_filepath):
+    """Reads a .lyp file into a dict of layer name -> 'layer/datatype'"""
+    with open(lyp_filepath, "r") as file:
+        layer_dict = xml_to_dict(file.read())["layer-properties"]["properties"]
+
+    layer_map = {}
+
+    for k in layer_dict:
+        src = k["source"]
+        layerInfo = src.partition("@")[0]
+        group_members = k.get("group-members")
+        if group_members is not None:
+            # encoutered a layer group, look inside:
+            if isinstance(group_members, dict):
+                # a single member is not wrapped in a list
+                group_members = [group_members]
+            for j in group_members:
+                layer_map[j["name"]] = j["source"].partition("@")[0]
+            if src != "*/*@*":
+                layer_map[k["name"]] = layerInfo
+        else:
+            try:
+                layer_map[k["name"]] = layerInfo
+            except TypeError as e:
+                new_message = (
+                    f"Bad name for layer {layerInfo}. Check your .lyp XML file for errors."
+                )
+
+                raise TypeError(new_message) from e
+
+    return layer_map
+
 
+# XML functions
+
+
+def _element_to_dict(t, children_dicts):
+    """Builds the dict of element t, given the dicts of its children"""
     d = {t.tag: {} if t.attrib else None}
-    children = list(t)
-    if children:
+    if children_dicts:
         dd = defaultdict(list)
-        for dc in map(etree_to_dict, children):
+        for dc in children_dicts:
             for k, v in dc.items():
                 dd[k].append(v)
         d = {t.tag: {k: v[0] if len(v) == 1 else v for k, v in dd.items()}}
@@ -85,7 +100,7 @@ def etree_to_dict(t):
         d[t.tag].update((f"@{k}", v) for k, v in t.attrib.items())
     if t.text:
         text = t.text.strip()
-        if children or t.attrib:
+        if children_dicts or t.attrib:
             if text:
                 d[t.tag]["#text"] = text
         else:
@@ -93,9 +108,29 @@ def etree_to_dict(t):
     return d
 
 
-def xml_to_dict(t):
-    from xml.etree import ElementTree as ET
+def etree_to_dict(t):
+    """XML to Dict parser
+    from: https://stackoverflow.com/questions/2148119/how-to-convert-an-xml-string-to-a-dictionary-in-python/10077069
+
+    The tree is walked iteratively (children before parents), so deep
+    files do not hit the recursion limit.
+    """
+    # stack of (element, its children, whether children were already pushed)
+    stack = [(t, list(t), False)]
+    # dicts of elements that are done, waiting for their parent
+    done = {}
+    while stack:
+        element, children, expanded = stack.pop()
+        if children and not expanded:
+            stack.append((element, children, True))
+            stack.extend((child, list(child), False) for child in children)
+            continue
+        children_dicts = [done.pop(id(child)) for child in children]
+        done[id(element)] = _element_to_dict(element, children_dicts)
+    return done[id(t)]
 
+
+def xml_to_dict(t):
     try:
         e = ET.XML(t)
     except ET.ParseError: